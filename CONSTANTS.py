@@ -1 +1,4 @@
 SPEED_MULTIPLIER = 1.0
+
+# Run macros through macro.optimize_macro when they are loaded
+OPTIMIZE_MACROS = False
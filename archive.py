@@ -1,4 +1,4 @@
-from screenocr import find_text_on_screen, find_text_and_return
+from screenocr import find_text_on_screen, read_screen, extract_matches, debug_sink
 from src import excel, epic, utils
 from macro import PyMacroRecordLib
 from pathlib import Path
@@ -7,6 +7,7 @@ import time
 pmr_lib = PyMacroRecordLib()
 pmr_lib.set_stop_key("esc")
 pmr_lib.reset_main_loop_stop_request()
+epic.init()
 
 print(f"--- Starting Main Processing Loop ---")
 print(f"Press '{pmr_lib.stop_key}' at any time to stop the script.")
@@ -27,7 +28,9 @@ for i in range(2506):
 
             no_psma_pet = utils.retry_till_false(
                 lambda: find_text_on_screen(
-                    "No results found for", region=(175, 375, 930, 960)
+                    "No results found for",
+                    region=(175, 375, 930, 960),
+                    fuzzy=True,
                 ),
                 retries=2,
                 delay=0.75,
@@ -36,17 +39,20 @@ for i in range(2506):
             has_psma_pet = not no_psma_pet
 
             if has_psma_pet:
-                psma_date = find_text_and_return(
-                    r"\b\d{1,2}/\d{1,2}/\d{4}\b",
-                    region=(782, 410, 920, 437),
-                    debug_save=True,
-                )
-
-                psma_history = find_text_and_return(
-                    r"\b\w+\s\d{1,2}/\d{1,2}/\d{4}\b",
-                    region=(782, 410, 932, 969),
-                    debug_save=True,
-                )
+                # One OCR pass over the results list; the latest date is its first row
+                results = read_screen(region=(782, 410, 932, 969), debug_save=True)
+                if results is None:
+                    psma_date, psma_history = [], []
+                else:
+                    psma_date = extract_matches(
+                        results.within((782, 410, 920, 437)),
+                        r"\b\d{1,2}/\d{1,2}/\d{4}\b",
+                    )
+                    psma_history = extract_matches(
+                        results, r"\b\w+\s\d{1,2}/\d{1,2}/\d{4}\b"
+                    )
+                    # Written in the background, and only kept when no date was read
+                    debug_sink.submit(results.image, "psma_date", failed=not psma_date)
 
                 excel.log_psma_pet(True)
                 excel.nav_up()
@@ -79,6 +85,7 @@ for i in range(2506):
         print(f"------- Iteration {i+1} Complete -------")
 
     except Exception as e:
+        debug_sink.dump_recent("exception")
         print(f"\n!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!", file=sys.stderr)
         print(f"!!! EXCEPTION in iteration {i+1}: {e}", file=sys.stderr)
         print(f"!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!", file=sys.stderr)
@@ -88,4 +95,5 @@ for i in range(2506):
         print("Stopping main loop due to error.")
         break
 
+debug_sink.flush(timeout=5)
 print("\n--- Main Processing Loop Finished or Stopped ---")
@@ -4,13 +4,22 @@ from pynput import mouse, keyboard
 from pynput.keyboard import Key, Listener as KeyboardListener
 from pynput.mouse import Button
 import time
-from time import sleep
 from datetime import datetime
-from threading import Thread, RLock
+from threading import Event, Thread, RLock
+from queue import Queue
+from collections import namedtuple
+from string import Template
 import json
+import mmap
+import logging
 import os
+import struct
 import sys  # Import sys for stderr
+import numpy as np
 import CONSTANTS
+from tracing import span
+
+logger = logging.getLogger(__name__)
 
 # ... (Keep KEY_NAME_MAP and vk_nb dictionaries as they are) ...
 KEY_NAME_MAP = {
@@ -61,6 +70,607 @@ vk_nb = {
 }
 
 
+# --- Compiled Macros ---
+# Op codes of compiled events
+MOVE, MOUSE_DOWN, MOUSE_UP, SCROLL, KEY_DOWN, KEY_UP, WAIT, TYPE_TEXT = range(8)
+
+CLICK_BUTTONS = {
+    "leftClickEvent": Button.left,
+    "rightClickEvent": Button.right,
+    "middleClickEvent": Button.middle,
+}
+
+
+# Wait events pause playback until the screen reaches a state, then continue at
+# once. kind: "text", "image" or "pixels"; target: phrase or image path;
+# region: (left, top, right, bottom) or None for the whole primary monitor.
+MacroWait = namedtuple(
+    "MacroWait", "kind target region timeout confidence fuzzy continue_on_timeout"
+)
+WAIT_EVENTS = {
+    "waitForText": "text",
+    "waitForImage": "image",
+    "waitForPixelChange": "pixels",
+}
+DEFAULT_WAIT_TIMEOUT = 10.0
+# Seconds between checks of a wait condition
+WAIT_POLL_INTERVAL = 0.05
+
+
+def compile_wait(event, base_dir=None):
+    """
+    Builds the MacroWait for a wait event, e.g.
+
+        {"type": "waitForText", "phrase": "Patient Name",
+         "region": [222, 382, 544, 497], "timeout": 5, "timestamp": 0}
+        {"type": "waitForImage", "image": "../assets/chart_review.png", "timeout": 5}
+        {"type": "waitForPixelChange", "region": [0, 0, 900, 800], "timeout": 2}
+
+    Optional fields: "confidence" (images), "fuzzy" (text) and
+    "continueOnTimeout" (carry on instead of stopping playback).
+    Image paths are relative to the macro file.
+    """
+    kind = WAIT_EVENTS[event["type"]]
+    if kind == "text":
+        target = event["phrase"]
+    elif kind == "image":
+        target = event["image"]
+        if base_dir and not os.path.isabs(target):
+            target = os.path.normpath(os.path.join(base_dir, target))
+    else:
+        target = None
+    region = event.get("region")
+    return MacroWait(
+        kind,
+        target,
+        tuple(region) if region else None,
+        float(event.get("timeout", DEFAULT_WAIT_TIMEOUT)),
+        float(event.get("confidence", 0.8)),
+        bool(event.get("fuzzy", False)),
+        bool(event.get("continueOnTimeout", False)),
+    )
+
+
+def _region_signature(region):
+    """Digest of a fresh capture of region (the primary monitor if None)."""
+    from screenocr import get_capture_session, image_digest
+
+    session = get_capture_session()
+    session.invalidate()
+    img = session.grab(region=region)
+    return image_digest(img.reduce(4) if region is None else img)
+
+
+def _wait_condition(wait, baseline=None):
+    """Returns a no-argument check for a MacroWait."""
+    # Imported here: screen capture and OCR (mss, pytesseract) load only for
+    # macros that wait on the screen, never for plain playback
+    if wait.kind == "text":
+        from screenocr import find_text_on_screen
+
+        return lambda: find_text_on_screen(
+            wait.target, region=wait.region, fuzzy=wait.fuzzy
+        )
+    if wait.kind == "image":
+        from src.utils import find_image_on_screen
+
+        return lambda: find_image_on_screen(wait.target, confidence=wait.confidence)
+    return lambda: _region_signature(wait.region) != baseline
+
+
+def resolve_key(key_str):
+    """Resolves a recorded key string ("Key.shift", "v", "<96>") to a pynput key."""
+    if key_str is None:
+        return None
+    if "Key." in key_str:
+        key = getattr(Key, key_str.split("Key.", 1)[1], None)
+        if key is None:
+            logger.warning("Could not resolve key '%s'", key_str)
+        return key
+    return vk_nb.get(key_str, key_str)
+
+
+class CompiledMacro:
+    """
+    A macro resolved once into ready-to-fire events.
+
+    Each event is an (op, delay, a, b) tuple: delay is the recorded delay before
+    the event, and a/b are its pre-resolved arguments (position and button, key,
+    scroll deltas, a MacroWait, or the string.Template of a typeText event). Events
+    that cannot fire (unknown keys) are dropped and their delay carried over to the
+    next event.
+    """
+
+    __slots__ = ("events", "_scaled")
+
+    def __init__(self, events):
+        self.events = events
+        self._scaled = {}
+
+    @staticmethod
+    def compile_event(event, delay, base_dir=None):
+        """Returns the (op, delay, a, b) tuple for one event dict, or None to drop it."""
+        event_type = event["type"]
+        if event_type == "cursorMove":
+            return (MOVE, delay, (event["x"], event["y"]), None)
+        if event_type in CLICK_BUTTONS:
+            op = MOUSE_DOWN if event["pressed"] else MOUSE_UP
+            return (op, delay, (event["x"], event["y"]), CLICK_BUTTONS[event_type])
+        if event_type == "scrollEvent":
+            return (SCROLL, delay, event["dx"], event["dy"])
+        if event_type == "keyboardEvent":
+            key = resolve_key(event["key"])
+            op = KEY_DOWN if event["pressed"] else KEY_UP
+            return (op, delay, key, None) if key is not None else None
+        if event_type in WAIT_EVENTS:
+            return (WAIT, delay, compile_wait(event, base_dir), None)
+        if event_type == "typeText":
+            # {"type": "typeText", "text": "${mrn}", "timestamp": 0}
+            return (TYPE_TEXT, delay, Template(event["text"]), None)
+        logger.warning("Skipping unknown macro event type '%s'", event_type)
+        return None
+
+    @classmethod
+    def from_data(cls, macro_data, base_dir=None):
+        events = []
+        carry = 0.0
+        for event in macro_data["events"]:
+            delay = carry + event["timestamp"]
+            compiled = cls.compile_event(event, delay, base_dir)
+            if compiled is None:
+                carry = delay
+            else:
+                carry = 0.0
+                events.append(compiled)
+        return cls(events)
+
+    @classmethod
+    def from_array(cls, records, table, base_dir=None):
+        """
+        Compiles events straight from a .pmrb record array and its string table,
+        without building an event dict for the common event types. Each key
+        string is resolved once, however often it is pressed.
+        """
+        codes = records["type"].tolist()
+        pressed = records["pressed"].tolist()
+        xs = _column_values(records["x"])
+        ys = _column_values(records["y"])
+        key_ids = records["key"].tolist()
+        delays = records["delay"].tolist()
+
+        strings = table["strings"]
+        resolved = {}  # string table index -> resolved key or Template
+        events = []
+        carry = 0.0
+        for code, down, x, y, key_id, delay in zip(
+            codes, pressed, xs, ys, key_ids, delays
+        ):
+            delay += carry
+            if code == PMRB_MOVE:
+                compiled = (MOVE, delay, (x, y), None)
+            elif code in PMRB_BUTTONS:
+                op = MOUSE_DOWN if down else MOUSE_UP
+                compiled = (op, delay, (x, y), PMRB_BUTTONS[code])
+            elif code == PMRB_SCROLL:
+                compiled = (SCROLL, delay, x, y)
+            elif code == PMRB_KEY:
+                if key_id not in resolved:
+                    resolved[key_id] = resolve_key(strings[key_id])
+                key = resolved[key_id]
+                op = KEY_DOWN if down else KEY_UP
+                compiled = (op, delay, key, None) if key is not None else None
+            elif code == PMRB_TYPE_TEXT:
+                if key_id not in resolved:
+                    resolved[key_id] = Template(strings[key_id])
+                compiled = (TYPE_TEXT, delay, resolved[key_id], None)
+            else:
+                # Waits and anything else are stored whole as JSON
+                event = json.loads(strings[key_id])
+                compiled = cls.compile_event(event, delay, base_dir)
+
+            if compiled is None:
+                carry = delay
+            else:
+                carry = 0.0
+                events.append(compiled)
+        return cls(events)
+
+    def __len__(self):
+        return len(self.events)
+
+    def scaled(self, speed, fixed_timestamp_ms=0):
+        """
+        Returns (delay, op, a, b) tuples with delays already scaled for playback.
+
+        Args:
+            speed (float): Playback speed multiplier (<= 0 plays without delays).
+            fixed_timestamp_ms (int): If > 0, every delay is this many milliseconds.
+        """
+        key = (speed, fixed_timestamp_ms)
+        scaled = self._scaled.get(key)
+        if scaled is None:
+            if fixed_timestamp_ms > 0:
+                delays = [fixed_timestamp_ms / 1000.0] * len(self.events)
+            elif speed > 0:
+                delays = [max(0.0, event[1] / speed) for event in self.events]
+            else:
+                delays = [0.0] * len(self.events)
+            scaled = [
+                (delay, op, a, b) for delay, (op, _, a, b) in zip(delays, self.events)
+            ]
+            self._scaled[key] = scaled
+        return scaled
+
+
+_compiled_macros = {}  # absolute path -> (mtime_ns, size, CompiledMacro)
+_compiled_macros_lock = RLock()
+
+
+def read_macro_file(file_path):
+    """
+    Reads a .pmr (or .pmrb) file into its {"events": [...]} dictionary.
+
+    Raises:
+        ValueError: If the file is not a macro.
+    """
+    if is_binary_macro(file_path):
+        return binary_to_data(*read_binary_macro(file_path))
+    with open(file_path, "r") as f:
+        macro_data = json.load(f)
+    if (
+        not isinstance(macro_data, dict)
+        or "events" not in macro_data
+        or not isinstance(macro_data["events"], list)
+    ):
+        raise ValueError(f"Invalid macro format in: {file_path}.")
+    return macro_data
+
+
+# --- Binary Macro Files (.pmrb) ---
+# Layout: header, then the string table as UTF-8 JSON padded to 8 bytes, then one
+# PMRB_DTYPE record per event. Records hold the type code, the pressed flag,
+# x/y (or dx/dy for scrolls), an index into the string table ("key": the key
+# string, typeText text, or the JSON of any other event), and the delay.
+PMRB_MAGIC = b"PMRB"
+PMRB_VERSION = 1
+PMRB_HEADER = struct.Struct("<4sIII")  # magic, version, event count, table bytes
+PMRB_DTYPE = np.dtype(
+    [
+        ("type", "u1"),
+        ("pressed", "u1"),
+        ("x", "<f8"),
+        ("y", "<f8"),
+        ("key", "<i4"),
+        ("delay", "<f8"),
+    ]
+)
+PMRB_EVENT_TYPES = (
+    "cursorMove",
+    "leftClickEvent",
+    "rightClickEvent",
+    "middleClickEvent",
+    "scrollEvent",
+    "keyboardEvent",
+    "typeText",
+)
+PMRB_MOVE, PMRB_LEFT, PMRB_RIGHT, PMRB_MIDDLE, PMRB_SCROLL, PMRB_KEY, PMRB_TYPE_TEXT = (
+    range(len(PMRB_EVENT_TYPES))
+)
+PMRB_OTHER = 255
+PMRB_BUTTONS = {
+    PMRB_LEFT: Button.left,
+    PMRB_RIGHT: Button.right,
+    PMRB_MIDDLE: Button.middle,
+}
+_PMRB_CODES = {name: code for code, name in enumerate(PMRB_EVENT_TYPES)}
+
+
+def _column_values(column):
+    """A float column as a list, of ints when every value is whole (as recorded)."""
+    if column.size and np.array_equal(column, np.trunc(column)):
+        return column.astype(np.int64).tolist()
+    return column.tolist()
+
+
+def _plain_number(value):
+    return int(value) if float(value).is_integer() else float(value)
+
+
+def is_binary_macro(file_path):
+    """True if file_path starts with the .pmrb magic bytes."""
+    with open(file_path, "rb") as f:
+        return f.read(len(PMRB_MAGIC)) == PMRB_MAGIC
+
+
+def write_binary_macro(macro_data, file_path):
+    """Writes a {"events": [...]} macro as a .pmrb file."""
+    strings = []
+    string_ids = {}
+
+    def intern(text):
+        if text not in string_ids:
+            string_ids[text] = len(strings)
+            strings.append(text)
+        return string_ids[text]
+
+    events = macro_data["events"]
+    records = np.zeros(len(events), dtype=PMRB_DTYPE)
+    codes, pressed, xs, ys, key_ids, delays = [], [], [], [], [], []
+    for event in events:
+        event_type = event["type"]
+        code = _PMRB_CODES.get(event_type, PMRB_OTHER)
+        x = y = 0
+        key_id = -1
+        if code in (PMRB_MOVE, PMRB_LEFT, PMRB_RIGHT, PMRB_MIDDLE):
+            x, y = event["x"], event["y"]
+        elif code == PMRB_SCROLL:
+            x, y = event["dx"], event["dy"]
+        elif code == PMRB_KEY:
+            key_id = intern(event["key"])
+        elif code == PMRB_TYPE_TEXT:
+            key_id = intern(event["text"])
+        else:
+            other = {k: v for k, v in event.items() if k != "timestamp"}
+            key_id = intern(json.dumps(other, sort_keys=True))
+        codes.append(code)
+        pressed.append(bool(event.get("pressed", False)))
+        xs.append(x)
+        ys.append(y)
+        key_ids.append(key_id)
+        delays.append(event["timestamp"])
+    records["type"] = codes
+    records["pressed"] = pressed
+    records["x"] = xs
+    records["y"] = ys
+    records["key"] = key_ids
+    records["delay"] = delays
+
+    meta = {k: v for k, v in macro_data.items() if k != "events"}
+    table = json.dumps({"strings": strings, "meta": meta}).encode("utf-8")
+    table += b" " * (-(PMRB_HEADER.size + len(table)) % 8)
+
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(PMRB_HEADER.pack(PMRB_MAGIC, PMRB_VERSION, len(events), len(table)))
+        f.write(table)
+        f.write(records.tobytes())
+    os.replace(tmp_path, file_path)
+
+
+def read_binary_macro(file_path):
+    """
+    Maps a .pmrb file without copying it.
+
+    Returns:
+        tuple: (records, table). records is a read-only PMRB_DTYPE array backed
+               by the mapping; table holds "strings" and "meta".
+
+    Raises:
+        ValueError: If the file is not a .pmrb file this version can read.
+    """
+    with open(file_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < PMRB_HEADER.size:
+            raise ValueError(f"Invalid binary macro: {file_path}.")
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, count, table_size = PMRB_HEADER.unpack_from(mapped)
+    offset = PMRB_HEADER.size + table_size
+    if (
+        magic != PMRB_MAGIC
+        or version != PMRB_VERSION
+        or offset + count * PMRB_DTYPE.itemsize > size
+    ):
+        raise ValueError(f"Invalid binary macro: {file_path}.")
+    table = json.loads(bytes(mapped[PMRB_HEADER.size : offset]))
+    records = np.frombuffer(mapped, dtype=PMRB_DTYPE, count=count, offset=offset)
+    return records, table
+
+
+def binary_to_data(records, table):
+    """Expands .pmrb records back into the {"events": [...]} JSON form."""
+    strings = table["strings"]
+    events = []
+    for code, down, x, y, key_id, delay in zip(
+        records["type"].tolist(),
+        records["pressed"].tolist(),
+        records["x"].tolist(),
+        records["y"].tolist(),
+        records["key"].tolist(),
+        records["delay"].tolist(),
+    ):
+        if code == PMRB_OTHER:
+            event = json.loads(strings[key_id])
+        else:
+            event = {"type": PMRB_EVENT_TYPES[code]}
+            if code == PMRB_SCROLL:
+                event.update(dx=_plain_number(x), dy=_plain_number(y))
+            elif code == PMRB_KEY:
+                event.update(key=strings[key_id], pressed=bool(down))
+            elif code == PMRB_TYPE_TEXT:
+                event["text"] = strings[key_id]
+            else:
+                event.update(x=_plain_number(x), y=_plain_number(y))
+                if code != PMRB_MOVE:
+                    event["pressed"] = bool(down)
+        event["timestamp"] = delay
+        events.append(event)
+    return dict(table.get("meta", {}), events=events)
+
+
+def write_macro_file(macro_data, file_path):
+    """Writes a macro as .pmrb if file_path ends in .pmrb, else as indented JSON."""
+    if file_path.endswith(".pmrb"):
+        write_binary_macro(macro_data, file_path)
+    else:
+        with open(file_path, "w") as f:
+            json.dump(macro_data, f, indent=4)
+
+
+def load_compiled_macro(file_path, optimize=False):
+    """
+    Returns the CompiledMacro for a .pmr or .pmrb file, parsing it only when
+    the file is new or has changed (by mtime and size) since it was last compiled.
+
+    Args:
+        file_path (str): Macro file, JSON or binary (detected by content).
+        optimize (bool): Run optimize_macro on the events before compiling.
+
+    Raises:
+        ValueError: If the file is not a macro ({"events": [...]}).
+    """
+    path = os.path.abspath(file_path)
+    stat = os.stat(path)
+    cache_key = (path, optimize)
+    with _compiled_macros_lock:
+        cached = _compiled_macros.get(cache_key)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+
+    base_dir = os.path.dirname(path)
+    if is_binary_macro(path) and not optimize:
+        # Compiled straight from the mapped records, with no event dicts
+        compiled = CompiledMacro.from_array(*read_binary_macro(path), base_dir)
+    else:
+        macro_data = read_macro_file(path)
+        if optimize:
+            optimized = optimize_macro(macro_data)
+            logger.info(
+                "Optimized %s: %s -> %s",
+                os.path.basename(path),
+                format_timing_summary(timing_report(macro_data)),
+                format_timing_summary(timing_report(optimized)),
+            )
+            macro_data = optimized
+        compiled = CompiledMacro.from_data(macro_data, base_dir)
+
+    with _compiled_macros_lock:
+        _compiled_macros[cache_key] = (stat.st_mtime_ns, stat.st_size, compiled)
+    return compiled
+
+
+# --- Macro Optimizer ---
+# Longest idle gap kept before an event that is not a click, key or wait
+MAX_IDLE_GAP = 0.3
+
+CLICK_OR_KEY_EVENTS = (
+    set(CLICK_BUTTONS) | {"keyboardEvent", "typeText"} | set(WAIT_EVENTS)
+)
+
+
+def optimize_macro(macro_data, max_idle=MAX_IDLE_GAP):
+    """
+    Returns an optimized copy of a macro.
+
+    - Runs of consecutive cursorMove events collapse into their final position.
+      The pause before a run starts is kept, since it usually follows a click or
+      key and is where the UI was given time to respond; the travel time within
+      the run (gaps followed only by more moves) is capped at max_idle.
+    - A move or scroll that does not lead into a click or key event (e.g. at
+      the end of the macro) has its whole delay capped at max_idle.
+
+    Args:
+        macro_data (dict): {"events": [...]} as stored in .pmr files.
+        max_idle (float): Longest idle time kept where nothing is waiting on it.
+    """
+    collapsed = []
+    travel = []  # Per collapsed event: move time folded in from later moves
+    for event in macro_data["events"]:
+        if (
+            event["type"] == "cursorMove"
+            and collapsed
+            and collapsed[-1]["type"] == "cursorMove"
+        ):
+            collapsed[-1] = dict(event, timestamp=collapsed[-1]["timestamp"])
+            travel[-1] += event["timestamp"]
+        else:
+            collapsed.append(dict(event))
+            travel.append(0.0)
+
+    for i, event in enumerate(collapsed):
+        if event["type"] in CLICK_OR_KEY_EVENTS:
+            continue
+        next_type = collapsed[i + 1]["type"] if i + 1 < len(collapsed) else None
+        if next_type in CLICK_OR_KEY_EVENTS:
+            event["timestamp"] += min(travel[i], max_idle)
+        else:
+            event["timestamp"] = min(event["timestamp"] + travel[i], max_idle)
+
+    optimized = dict(macro_data)
+    optimized["events"] = collapsed
+    return optimized
+
+
+def timing_report(macro_data, top=5):
+    """
+    Static timing summary of a macro.
+
+    Returns:
+        dict: "events" (count), "duration" (seconds at speed 1), "counts" per
+              event type, and "longest_gaps" as (index, delay, event type).
+    """
+    events = macro_data["events"]
+    counts = {}
+    for event in events:
+        counts[event["type"]] = counts.get(event["type"], 0) + 1
+    gaps = sorted(
+        ((i, event["timestamp"], event["type"]) for i, event in enumerate(events)),
+        key=lambda gap: gap[1],
+        reverse=True,
+    )
+    return {
+        "events": len(events),
+        "duration": sum(event["timestamp"] for event in events),
+        "counts": counts,
+        "longest_gaps": gaps[:top],
+    }
+
+
+def format_timing_summary(report):
+    """One-line form of a timing_report."""
+    return f"{report['events']} events, {report['duration']:.2f} s"
+
+
+def format_timing_report(report):
+    """Multi-line, human-readable form of a timing_report."""
+    lines = [
+        f"  Total duration: {report['duration']:.2f} s over {report['events']} events",
+        "  Event counts: "
+        + ", ".join(f"{name}={n}" for name, n in sorted(report["counts"].items())),
+        "  Longest gaps:",
+    ]
+    lines += [
+        f"    #{index:<5} {delay:7.3f} s before {event_type}"
+        for index, delay, event_type in report["longest_gaps"]
+    ]
+    return "\n".join(lines)
+
+
+# events: events fired; mean_ms/max_ms: lateness against the absolute schedule;
+# late_events: events fired more than LATE_EVENT_MS after their deadline
+PlaybackTiming = namedtuple("PlaybackTiming", "events mean_ms max_ms late_events")
+LATE_EVENT_MS = 5.0
+
+
+class PlaybackJob:
+    """
+    One queued run of a macro. stop asks this run (and only this run) to end;
+    done is set the moment it has ended, and failed tells whether it stopped on
+    an error or a wait timeout.
+    """
+
+    def __init__(self, macro, variables=None):
+        self.macro = macro
+        self.variables = variables or {}  # Values for ${name} in typeText events
+        self.stop = Event()  # Wakes the worker immediately when set
+        self.done = Event()
+        self.failed = False
+        self.timing = None
+
+    def wait(self, timeout=None):
+        """Blocks until the run ends. Returns False if the timeout expired first."""
+        return self.done.wait(timeout)
+
+
 # --- MacroPlayback Class (Listener Logic Removed) ---
 class MacroPlayback:
     """Core playback logic - Listener managed by PyMacroRecordLib"""
@@ -70,70 +680,112 @@ class MacroPlayback:
         self.mouse_control = mouse.Controller()
         self.keyboard_control = keyboard.Controller()
         self.playback = False
-        self.macro_events = {"events": []}
+        self.macro = CompiledMacro([])
         self.settings = settings
-        self.__play_macro_thread = None
+        # One long-lived worker runs queued jobs, so no thread is started per macro
+        self._jobs = Queue()
+        self._worker = None
+        self.current_job = None
         # self._stop_listener = None # REMOVED
         # self.stop_key = stop_key # REMOVED
         self._lock = RLock()
+        self.lateness = (
+            []
+        )  # Seconds each event of the last run fired after its deadline
+        self.last_timing = None
 
     def load_macro(self, macro_data):
-        """Load macro events from a dictionary (parsed JSON)"""
-        self.macro_events = macro_data
+        """Load macro events from a dictionary (parsed JSON) or a CompiledMacro"""
+        if not isinstance(macro_data, CompiledMacro):
+            macro_data = CompiledMacro.from_data(macro_data)
+        self.macro = macro_data
 
     # REMOVE set_stop_key, _parse_key_string, set_stop_key_from_string methods
     # REMOVE _on_press_stop_key method
 
-    def start_playback(self):
-        """Start macro playback programmatically. Returns True on success, False otherwise."""
+    def start_playback(self, variables=None):
+        """
+        Start macro playback programmatically.
+
+        Args:
+            variables (dict): Values for ${name} placeholders in typeText events.
+
+        Returns:
+            PlaybackJob or None: The queued run (wait on it for completion), or
+                                 None if playback could not start.
+        """
         with self._lock:
-            if not self.macro_events["events"]:
-                print("No macro loaded or macro is empty.")
-                return False
+            if not len(self.macro):
+                logger.warning("No macro loaded or macro is empty.")
+                return None
             if self.playback:
-                print("Playback already in progress.")
-                return False
-            if self.__play_macro_thread and self.__play_macro_thread.is_alive():
-                print(
-                    "Warning: Playback thread seems to be already running.",
-                    file=sys.stderr,
+                logger.warning("Playback already in progress.")
+                return None
+            if self.current_job is not None and not self.current_job.done.is_set():
+                # Stopped but still unwinding (e.g. inside OCR or typing)
+                logger.warning("Previous playback run has not finished yet.")
+                return None
+
+            self.playback = True  # Set flag *before* queueing the job
+            job = PlaybackJob(self.macro, variables)
+            self.current_job = job
+
+            if self._worker is None or not self._worker.is_alive():
+                logger.debug("Starting playback worker thread...")
+                self._worker = Thread(
+                    target=self.__run_jobs, name="MacroPlayback", daemon=True
                 )
-                # Optionally try to join/stop previous thread? Risky. Better to prevent.
-                return False  # Prevent starting if thread already exists
+                self._worker.start()
 
-            self.playback = True  # Set flag *before* starting threads
+        self._jobs.put(job)
+        return job
 
-        # --- Playback Thread ---
-        # Ensure previous thread object is cleared if it finished/died
-        self.__play_macro_thread = None
-        print("Starting playback thread...")
-        self.__play_macro_thread = Thread(target=self.__play_events, daemon=True)
-        self.__play_macro_thread.start()
-        return True  # Indicate success
+    def __run_jobs(self):
+        """Worker loop: plays queued jobs one at a time for the life of the process."""
+        while True:
+            job = self._jobs.get()
+            try:
+                self.__play_events(job)
+            except Exception as e:
+                logger.error("Playback worker error: %s", e)
+                job.failed = True
+                with self._lock:
+                    self.playback = False
+            finally:
+                job.timing = self.last_timing
+                job.done.set()
 
     def stop_playback(self):
         """Stop macro playback programmatically. Thread-safe."""
-        print("Playback engine stop requested...")
+        logger.debug("Playback engine stop requested...")
         with self._lock:
             if not self.playback:
                 # print("Playback engine is not currently marked as active.") # Less verbose
                 return  # Already stopped or stopping
 
-            print("Setting playback engine flag to False.")
+            logger.debug("Setting playback engine flag to False.")
             self.playback = False  # Set flag to signal the playback thread
+            if self.current_job is not None:
+                self.current_job.stop.set()
 
         # Listener is stopped by PyMacroRecordLib now
-        print("Playback engine stop process initiated.")
+        logger.debug("Playback engine stop process initiated.")
 
-    def __play_events(self):
-        """Internal method to execute macro events in a thread."""
+    def __play_events(self, job):
+        """Internal method to execute a job's macro events on the worker thread."""
         # --- Initialization before loop ---
         user_settings = self.settings.get_config()
-        click_func = {
-            "leftClickEvent": Button.left,
-            "rightClickEvent": Button.right,
-            "middleClickEvent": Button.middle,
-        }
+        variables = job.variables
+        events = job.macro.scaled(
+            user_settings["Playback"]["Speed"],
+            user_settings["Others"]["Fixed_timestamp"],
+        )
+        mouse_control = self.mouse_control
+        keyboard_control = self.keyboard_control
+        stop_event = job.stop
+        monotonic = time.monotonic
+        lateness = []
+        self.lateness = lateness
         key_to_unpress = []
         repeat_times = (
             user_settings["Playback"]["Repeat"]["Times"]
@@ -160,22 +812,18 @@ class MacroPlayback:
                 seconds_to_wait += 86400
 
             if seconds_to_wait > 0:
-                print(f"Scheduled start: Waiting for {seconds_to_wait:.2f} seconds...")
-                wait_interval = 0.5
-                while seconds_to_wait > 0:
+                logger.debug(
+                    "Scheduled start: Waiting for %.2f seconds...", seconds_to_wait
+                )
+                if stop_event.wait(seconds_to_wait):
+                    logger.debug(
+                        "Playback stopped by external request before scheduled start."
+                    )
+                    self.__unpress_everything(key_to_unpress)
                     with self._lock:
-                        if not self.playback:
-                            break
-                    sleep(min(wait_interval, seconds_to_wait))
-                    seconds_to_wait -= wait_interval
-                with self._lock:
-                    if not self.playback:
-                        print(
-                            "Playback stopped by external request before scheduled start."
-                        )
-                        self.__unpress_everything(key_to_unpress)
-                        return
-                print("Scheduled time reached. Starting playback.")
+                        self.playback = False
+                    return
+                logger.debug("Scheduled time reached. Starting playback.")
 
         # --- Repeat Loop ---
         repeat_count = 0
@@ -183,120 +831,113 @@ class MacroPlayback:
         while loop_running:
             with self._lock:  # Check stop flag at start of loop
                 if not self.playback:
-                    print("Playback flag is false at start of repeat loop.")
+                    logger.debug("Playback flag is false at start of repeat loop.")
                     loop_running = False
                     break
 
             repeat_count += 1
             # Check duration/times limits
             if repeat_duration and (time.time() - start_time) >= repeat_duration:
-                print(f"Repeat duration ({repeat_duration}s) reached.")
+                logger.debug("Repeat duration (%ss) reached.", repeat_duration)
                 loop_running = False
                 break
             if not repeat_duration and repeat_count > repeat_times:
-                print(f"Repeat times ({repeat_times}) reached.")
+                logger.debug("Repeat times (%s) reached.", repeat_times)
                 loop_running = False
                 break
 
             # print(f"--- Starting Repeat #{repeat_count} ---") # Can be verbose
 
             # --- Event Loop ---
-            for event_data in self.macro_events["events"]:
-                with self._lock:  # Check stop flag before each event
-                    if not self.playback:
-                        print(
-                            "Playback stopped by external request during event execution."
-                        )
-                        loop_running = False
-                        break
-
-                # Calculate Sleep Time
-                time_sleep = event_data["timestamp"]
-                # ... (sleep calculation logic remains the same) ...
-                if user_settings["Others"]["Fixed_timestamp"] > 0:
-                    time_sleep = user_settings["Others"]["Fixed_timestamp"] / 1000.0
+            # Deadlines are absolute, so time spent firing events never accumulates
+            deadline = monotonic()
+            for time_sleep, op, arg_a, arg_b in events:
+                baseline = None
+                if op == WAIT and arg_a.kind == "pixels":
+                    # Compare against the screen as the previous event left it
+                    try:
+                        baseline = _region_signature(arg_a.region)
+                    except Exception as e:
+                        logger.error("Could not capture wait baseline: %s", e)
+                deadline += time_sleep
+                remaining = deadline - monotonic()
+                if remaining > 0:
+                    stopped = stop_event.wait(remaining)
                 else:
-                    speed_multiplier = user_settings["Playback"]["Speed"]
-                    if speed_multiplier > 0:
-                        time_sleep /= speed_multiplier
-                    else:
-                        time_sleep = 0
-                time_sleep = max(0, time_sleep)
-
-                # Sleep with Interrupt Check
-                sleep_interval = 0.05
-                remaining_sleep = time_sleep
-                while remaining_sleep > 0:
-                    with self._lock:  # Check stop flag during sleep
-                        if not self.playback:
-                            break
-                    sleep(min(sleep_interval, remaining_sleep))
-                    remaining_sleep -= sleep_interval
-                with self._lock:  # Check again after sleep
-                    if not self.playback:
-                        print(
-                            "Playback stopped by external request during sleep interval."
-                        )
-                        loop_running = False
-                        break
+                    stopped = stop_event.is_set()
+                if stopped:
+                    logger.debug("Playback stopped by external request.")
+                    loop_running = False
+                    break
+                lateness.append(monotonic() - deadline)
 
                 # --- Execute Event ---
-                if not loop_running:
-                    break  # Exit if stopped during sleep
-
-                event_type = event_data["type"]
                 try:
-                    # ... (event execution logic remains the same) ...
-                    if event_type == "cursorMove":
-                        self.mouse_control.position = (event_data["x"], event_data["y"])
-                    elif event_type in click_func:
-                        self.mouse_control.position = (event_data["x"], event_data["y"])
-                        button = click_func[event_type]
-                        if event_data["pressed"]:
-                            self.mouse_control.press(button)
-                        else:
-                            self.mouse_control.release(button)
-                    elif event_type == "scrollEvent":
-                        self.mouse_control.scroll(event_data["dx"], event_data["dy"])
-                    elif event_type == "keyboardEvent":
-                        if event_data["key"] is not None:
-                            key_str = event_data["key"]
-                            key_to_press = None
-                            if "Key." in key_str:
-                                try:
-                                    key_to_press = eval(key_str, {"Key": Key})
-                                except Exception as e:
-                                    print(
-                                        f"Warning: Could not evaluate key '{key_str}': {e}",
-                                        file=sys.stderr,
-                                    )
-                            elif key_str in vk_nb:
-                                key_to_press = vk_nb[key_str]
-                            else:
-                                key_to_press = key_str
-
-                            if key_to_press is not None:
-                                if event_data["pressed"]:
-                                    self.keyboard_control.press(key_to_press)
-                                    if key_to_press not in key_to_unpress:
-                                        key_to_unpress.append(key_to_press)
-                                else:
-                                    self.keyboard_control.release(key_to_press)
-                                    if key_to_press in key_to_unpress:
-                                        try:
-                                            key_to_unpress.remove(key_to_press)
-                                        except ValueError:
-                                            pass
+                    if op == MOVE:
+                        mouse_control.position = arg_a
+                    elif op == KEY_DOWN:
+                        keyboard_control.press(arg_a)
+                        if arg_a not in key_to_unpress:
+                            key_to_unpress.append(arg_a)
+                    elif op == KEY_UP:
+                        keyboard_control.release(arg_a)
+                        if arg_a in key_to_unpress:
+                            key_to_unpress.remove(arg_a)
+                    elif op == MOUSE_DOWN:
+                        mouse_control.position = arg_a
+                        mouse_control.press(arg_b)
+                    elif op == MOUSE_UP:
+                        mouse_control.position = arg_a
+                        mouse_control.release(arg_b)
+                    elif op == SCROLL:
+                        mouse_control.scroll(arg_a, arg_b)
+                    elif op == TYPE_TEXT:
+                        try:
+                            text = arg_a.substitute(variables)
+                        except KeyError as e:
+                            raise ValueError(f"no value for ${{{e.args[0]}}}") from e
+                        # The whole string in one burst, no per-character delay
+                        keyboard_control.type(text)
+                        # Typing takes as long as the text does, not as recorded
+                        deadline = monotonic()
+                    elif op == WAIT:
+                        outcome = self.__wait(arg_a, stop_event, baseline)
+                        if outcome is None:
+                            logger.debug("Playback stopped during a wait event.")
+                            loop_running = False
+                            break
+                        if not outcome and arg_a.continue_on_timeout:
+                            logger.warning(
+                                "Wait for %s %s timed out after %.1f s; continuing.",
+                                arg_a.kind,
+                                arg_a.target or arg_a.region,
+                                arg_a.timeout,
+                            )
+                        elif not outcome:
+                            logger.error(
+                                "Wait for %s %s timed out after %.1f s; stopping.",
+                                arg_a.kind,
+                                arg_a.target or arg_a.region,
+                                arg_a.timeout,
+                            )
+                            job.failed = True
+                            loop_running = False
+                            job.stop.set()
+                            break
+                        # Resume the schedule from when the UI was ready
+                        deadline = monotonic()
 
                 except Exception as e:
-                    print(
-                        f"Error during playback execution (Event: {event_data}): {e}",
-                        file=sys.stderr,
+                    logger.error(
+                        "Error during playback execution (Event: %s): %s",
+                        (op, arg_a, arg_b),
+                        e,
                     )
-                    print("Stopping playback engine due to error.", file=sys.stderr)
+                    logger.error("Stopping playback engine due to error.")
+                    job.failed = True
                     loop_running = False  # Signal to exit loops
-                    # Signal the engine's stop mechanism
-                    Thread(target=self.stop_playback, daemon=True).start()
+                    # Only this job is stopped; the playback flag is cleared on exit
+                    job.stop.set()
                     break
 
             # --- Check Stop Condition AFTER event loop ---
@@ -310,40 +951,64 @@ class MacroPlayback:
             )
 
             if repeat_delay > 0 and not is_last_repeat:
-                # print(f"--- Delaying for {repeat_delay}s before next repeat ---") # Verbose
-                sleep_interval = 0.1
-                remaining_delay = repeat_delay
-                while remaining_delay > 0:
-                    with self._lock:  # Check stop flag during delay
-                        if not self.playback:
-                            break
-                    sleep(min(sleep_interval, remaining_delay))
-                    remaining_delay -= sleep_interval
-                with self._lock:
-                    if not self.playback:
-                        print(
-                            "Playback stopped by external request during repeat delay."
-                        )
-                        loop_running = False
-                        # No break needed here, loop condition handles it
+                if stop_event.wait(repeat_delay):
+                    logger.debug(
+                        "Playback stopped by external request during repeat delay."
+                    )
+                    loop_running = False
 
         # --- End of Playback ---
-        print("Playback engine loop finished or was stopped.")
+        logger.debug("Playback engine loop finished or was stopped.")
         self.__unpress_everything(key_to_unpress)
+        self.last_timing = self.__timing_report(lateness)
 
         # --- Crucially: Set playback flag to False *from within the thread* when done ---
-        # This indicates the thread has finished its work naturally.
-        print("Playback thread marking itself as finished.")
+        # This indicates the run has finished its work naturally.
+        logger.debug("Playback run marking itself as finished.")
         with self._lock:
             self.playback = False
 
-        print("Playback thread terminating.")
+    def __wait(self, wait, stop_event, baseline=None):
+        """
+        Polls a wait event's condition until it holds.
+
+        Returns:
+            bool or None: True when met, False on timeout, None if playback was
+                          stopped meanwhile.
+        """
+        condition = _wait_condition(wait, baseline)
+        end = time.monotonic() + wait.timeout
+        while True:
+            if condition():
+                return True
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return False
+            if stop_event.wait(min(WAIT_POLL_INTERVAL, remaining)):
+                return None
+
+    def __timing_report(self, lateness):
+        """Summarises how far behind its absolute schedule each event fired."""
+        if not lateness:
+            return PlaybackTiming(0, 0.0, 0.0, 0)
+        late_ms = [late * 1000 for late in lateness]
+        timing = PlaybackTiming(
+            len(late_ms),
+            sum(late_ms) / len(late_ms),
+            max(late_ms),
+            sum(1 for late in late_ms if late > LATE_EVENT_MS),
+        )
+        logger.debug(
+            "Playback lateness: %d events, mean %.2f ms, max %.2f ms, %d late",
+            *timing,
+        )
+        return timing
 
     def __unpress_everything(self, key_to_unpress):
         """Release keys tracked *during this specific playback run*."""
         # ... (unpress logic remains the same) ...
         if key_to_unpress:
-            print(f"Releasing {len(key_to_unpress)} potentially held keys...")
+            logger.debug("Releasing %s potentially held keys...", len(key_to_unpress))
             keys_released_count = 0
             for key in list(key_to_unpress):
                 try:
@@ -393,13 +1058,12 @@ try:
                     else:
                         self._config[section] = value
                 except KeyError:
-                    print(
-                        f"Error: Invalid setting path {section}/{sub_section}/{key}",
-                        file=sys.stderr,
+                    logger.error(
+                        "Invalid setting path %s/%s/%s", section, sub_section, key
                     )
 
 except ImportError:
-    print("Warning: Could not import UserSettings. Using placeholder.", file=sys.stderr)
+    logger.warning("Could not import UserSettings. Using placeholder.")
     # Define the dummy UserSettings class here if needed
 
 
@@ -412,7 +1076,7 @@ class PyMacroRecordLib:
         if cls._instance is None:
             with cls._lock:
                 if cls._instance is None:
-                    print("Creating new PyMacroRecordLib singleton instance.")
+                    logger.debug("Creating new PyMacroRecordLib singleton instance.")
                     cls._instance = super().__new__(cls)
                     cls._instance._initialized = False
         return cls._instance
@@ -421,12 +1085,13 @@ class PyMacroRecordLib:
         if getattr(self, "_initialized", False):
             return
 
-        print("Initializing PyMacroRecordLib singleton...")
+        logger.debug("Initializing PyMacroRecordLib singleton...")
         with self._lock:  # Protect initialization
             # --- Core Attributes ---
             self.settings = UserSettings(None)  # Or load your actual settings
             self.playback_engine = MacroPlayback(self.settings)
             self._active = False  # Tracks if WE intended playback to start
+            self._job = None  # The run started by start_playback
 
             # --- NEW: State for Main Loop Control ---
             self.user_requested_main_loop_stop = False
@@ -440,7 +1105,7 @@ class PyMacroRecordLib:
             self._start_global_listener()
 
             self._initialized = True
-            print("Singleton initialization complete. Global listener started.")
+            logger.debug("Singleton initialization complete. Global listener started.")
 
     # --- NEW: Listener Methods (moved here) ---
     def _parse_key_string(self, key_string):
@@ -457,9 +1122,10 @@ class PyMacroRecordLib:
                     return key
             except Exception:
                 pass
-            print(
-                f"Warning: Could not parse stop key '{key_string}'. Using default: {self.stop_key}",
-                file=sys.stderr,
+            logger.warning(
+                "Could not parse stop key '%s'. Using default: %s",
+                key_string,
+                self.stop_key,
             )
             return self.stop_key
 
@@ -468,7 +1134,7 @@ class PyMacroRecordLib:
         parsed_key = self._parse_key_string(key_string)
         if self.stop_key != parsed_key:
             self.stop_key = parsed_key
-            print(f"Global stop key set to: {self.stop_key}")
+            logger.debug("Global stop key set to: %s", self.stop_key)
             # Restart listener with the new key
             self._stop_global_listener()
             self._start_global_listener()
@@ -477,50 +1143,45 @@ class PyMacroRecordLib:
         """Callback for the global keyboard listener."""
         try:
             if key == self.stop_key:
-                print(f"\n>>> Global Stop Key ({self.stop_key}) pressed! <<<")
+                logger.warning(">>> Global Stop Key (%s) pressed! <<<", self.stop_key)
 
                 # 1. Signal the main loop to stop
-                print("Signaling main loop termination...")
+                logger.debug("Signaling main loop termination...")
                 self.request_main_loop_stop()  # Use the new method
 
                 # 2. Signal the current playback engine run to stop (if active)
-                print("Requesting current macro playback engine stop...")
+                logger.debug("Requesting current macro playback engine stop...")
                 # Run stop_playback in a thread to avoid blocking listener
                 Thread(target=self.playback_engine.stop_playback, daemon=True).start()
 
         except Exception as e:
-            print(f"Error in global stop key listener callback: {e}", file=sys.stderr)
+            logger.error("Error in global stop key listener callback: %s", e)
 
     def _start_global_listener(self):
         """Starts the single global keyboard listener."""
         if self._stop_listener is not None:
-            print(
-                "Warning: Global listener already exists. Stopping previous one.",
-                file=sys.stderr,
-            )
+            logger.warning("Global listener already exists. Stopping previous one.")
             self._stop_global_listener()
         try:
-            print(f"Starting global listener for stop key: {self.stop_key}")
+            logger.debug("Starting global listener for stop key: %s", self.stop_key)
             # Create as daemon so it doesn't block exit
             self._stop_listener = KeyboardListener(
                 on_press=self._on_press_stop_key, daemon=True
             )
             self._stop_listener.start()
         except Exception as e:
-            print(
-                f"FATAL: Error starting global keyboard listener: {e}", file=sys.stderr
-            )
+            logger.error("FATAL: Error starting global keyboard listener: %s", e)
             self._stop_listener = None  # Ensure it's None if start failed
 
     def _stop_global_listener(self):
         """Stops the single global keyboard listener."""
         if self._stop_listener:
-            print("Stopping global listener...")
+            logger.debug("Stopping global listener...")
             try:
                 self._stop_listener.stop()
                 # self._stop_listener.join(timeout=0.5) # Optional wait
             except Exception as e:
-                print(f"Error stopping global listener: {e}", file=sys.stderr)
+                logger.error("Error stopping global listener: %s", e)
             finally:
                 self._stop_listener = None
 
@@ -529,7 +1190,7 @@ class PyMacroRecordLib:
         """Sets the flag to indicate the main loop should stop."""
         with self._main_stop_lock:
             self.user_requested_main_loop_stop = True
-            print("Main loop stop request flag SET.")
+            logger.debug("Main loop stop request flag SET.")
 
     def should_main_loop_stop(self):
         """Checks if the main loop stop has been requested."""
@@ -541,59 +1202,54 @@ class PyMacroRecordLib:
         """Resets the flag before starting a batch run."""
         with self._main_stop_lock:
             if self.user_requested_main_loop_stop:
-                print("Resetting main loop stop request flag.")
+                logger.debug("Resetting main loop stop request flag.")
                 self.user_requested_main_loop_stop = False
 
     # --- Core Methods (operate on the single playback_engine) ---
 
-    def load_macro_file(self, file_path):
-        """Load a macro file (.pmr or .json)."""
+    def load_macro_file(self, file_path, optimize=False):
+        """Load a macro file (.pmr or .json), optionally through optimize_macro."""
         # ... (load logic remains the same, uses self.playback_engine) ...
         if not os.path.exists(file_path):
-            print(f"Error: Macro file not found: {file_path}", file=sys.stderr)
+            logger.error("Macro file not found: %s", file_path)
             return False
         try:
-            with open(file_path, "r") as f:
-                macro_data = json.load(f)
-            if (
-                not isinstance(macro_data, dict)
-                or "events" not in macro_data
-                or not isinstance(macro_data["events"], list)
-            ):
-                print(f"Error: Invalid macro format in: {file_path}.", file=sys.stderr)
-                return False
-            self.playback_engine.load_macro(macro_data)
-            # print(f"Macro loaded: {os.path.basename(file_path)}") # Less verbose
+            # Compiled once per file version; later calls reuse the cached events
+            self.playback_engine.load_macro(load_compiled_macro(file_path, optimize))
             return True
         except Exception as e:
-            print(f"Error loading macro file {file_path}: {e}", file=sys.stderr)
+            logger.error("Error loading macro file %s: %s", file_path, e)
             return False
 
-    def start_playback(self):
-        """Start the loaded macro playback using the singleton engine."""
+    def start_playback(self, variables=None):
+        """
+        Start the loaded macro playback using the singleton engine.
+
+        Returns:
+            PlaybackJob or None: The queued run, or None if it could not start.
+        """
         if self._active:
-            print(
-                "Warning: Playback start requested, but already marked as active.",
-                file=sys.stderr,
-            )
-            return  # Don't start again if we think it's running
+            logger.warning("Playback start requested, but already marked as active.")
+            return None  # Don't start again if we think it's running
 
         # Reset engine's internal flag just in case it got stuck? Risky.
         # Assume engine state is reliable.
 
-        print("Attempting to start playback engine...")
-        success = self.playback_engine.start_playback()
-        if success:
+        logger.debug("Attempting to start playback engine...")
+        job = self.playback_engine.start_playback(variables)
+        if job is not None:
+            self._job = job
             self._active = True  # Mark that we initiated a start
-            print("Playback engine successfully started.")
+            logger.debug("Playback engine successfully started.")
         else:
             self._active = False
-            print("Playback engine failed to start.", file=sys.stderr)
+            logger.error("Playback engine failed to start.")
+        return job
 
     def stop_playback(self):
         """Stop the macro playback if it's running using the singleton engine."""
         # This method is primarily for programmatic stopping, Esc uses the listener directly.
-        print("Programmatic stop requested for playback engine.")
+        logger.debug("Programmatic stop requested for playback engine.")
         self.playback_engine.stop_playback()
         self._active = (
             False  # Mark that we requested stop / it's no longer intended active
@@ -609,44 +1265,50 @@ class PyMacroRecordLib:
             self._active = False
         return engine_is_running
 
-    def wait_for_playback_to_finish(self, check_interval=0.2):
-        """Wait until playback engine thread is no longer active."""
-        if not self.is_playing():  # Use our updated is_playing()
-            # print("Playback not running, nothing to wait for.") # Verbose
+    def wait_for_playback_to_finish(self, check_interval=0.2, job=None):
+        """
+        Wait until a playback run (by default the last one started) is done.
+
+        Returns as soon as the run signals completion; check_interval only bounds
+        how long a main loop stop request can go unnoticed.
+        """
+        job = job or self._job
+        if job is None or job.done.is_set():
+            self._active = False
             return
 
-        print("Waiting for playback engine to finish...")
-        # Loop while the engine thread reports it's running
-        while self.playback_engine.playback:  # Check engine flag directly here
+        logger.debug("Waiting for playback engine to finish...")
+        while True:
+            try:
+                if job.wait(check_interval):
+                    break
+            except KeyboardInterrupt:  # Handle Ctrl+C during wait
+                logger.warning("Wait interrupted by Ctrl+C. Requesting stop...")
+                self.request_main_loop_stop()  # Signal main loop too
+                Thread(target=self.playback_engine.stop_playback, daemon=True).start()
+                break
+
             # --- NEW: Check for main loop stop request DURING wait ---
             if self.should_main_loop_stop():
-                print("Main loop stop requested during wait. Aborting wait.")
+                logger.debug("Main loop stop requested during wait. Aborting wait.")
                 # Ensure playback stop is triggered again if needed
                 if self.playback_engine.playback:
-                    print("Re-requesting engine stop...")
+                    logger.debug("Re-requesting engine stop...")
                     Thread(
                         target=self.playback_engine.stop_playback, daemon=True
                     ).start()
                 break  # Exit the wait loop early
 
-            try:
-                time.sleep(check_interval)
-            except KeyboardInterrupt:  # Handle Ctrl+C during wait
-                print("\nWait interrupted by Ctrl+C. Requesting stop...")
-                self.request_main_loop_stop()  # Signal main loop too
-                Thread(target=self.playback_engine.stop_playback, daemon=True).start()
-                break
-
         # Update our active flag after waiting finishes
         self._active = False
-        print("Wait finished. Playback engine stopped or main stop requested.")
+        logger.debug("Wait finished. Playback engine stopped or main stop requested.")
 
     # --- Configuration Methods (remain the same, operate on self.settings) ---
     def set_playback_speed(self, speed):
         if 0.1 <= speed <= 10:
             self.settings.change_settings("Playback", "Speed", None, float(speed))
         else:
-            print("Error: Playback speed must be between 0.1 and 10.", file=sys.stderr)
+            logger.error("Playback speed must be between 0.1 and 10.")
 
     # ... other configuration methods (set_repeat_times, etc.) remain the same ...
     def set_repeat_times(self, times):
@@ -656,19 +1318,14 @@ class PyMacroRecordLib:
             if self.settings.get_config()["Playback"]["Repeat"]["For"] != 0:
                 self.settings.change_settings("Playback", "Repeat", "For", 0)
         else:
-            print(
-                "Error: Repeat times must be between 1 and 100000000.", file=sys.stderr
-            )
+            logger.error("Repeat times must be between 1 and 100000000.")
 
     def set_repeat_for_duration(self, duration_sec):
         duration_sec = float(duration_sec)
         if 0 <= duration_sec <= 86400 * 7:
             self.settings.change_settings("Playback", "Repeat", "For", duration_sec)
         else:
-            print(
-                "Error: Repeat duration must be between 0 and 604800 seconds.",
-                file=sys.stderr,
-            )
+            logger.error("Repeat duration must be between 0 and 604800 seconds.")
 
     def set_fixed_timestamp(self, timestamp_ms):
         timestamp_ms = int(timestamp_ms)
@@ -677,10 +1334,7 @@ class PyMacroRecordLib:
                 "Others", "Fixed_timestamp", None, timestamp_ms
             )
         else:
-            print(
-                "Error: Fixed timestamp must be between 0 and 100000000 ms.",
-                file=sys.stderr,
-            )
+            logger.error("Fixed timestamp must be between 0 and 100000000 ms.")
 
     def set_scheduled_start(self, scheduled_sec_since_midnight):
         scheduled_sec_since_midnight = int(scheduled_sec_since_midnight)
@@ -689,18 +1343,14 @@ class PyMacroRecordLib:
                 "Playback", "Repeat", "Scheduled", scheduled_sec_since_midnight
             )
         else:
-            print(
-                "Error: Scheduled start must be between 0 and 86400.", file=sys.stderr
-            )
+            logger.error("Scheduled start must be between 0 and 86400.")
 
     def set_delay_between_repeats(self, delay_sec):
         delay_sec = float(delay_sec)
         if 0 <= delay_sec <= 100000000:
             self.settings.change_settings("Playback", "Repeat", "Delay", delay_sec)
         else:
-            print(
-                "Error: Delay must be between 0 and 100000000 seconds.", file=sys.stderr
-            )
+            logger.error("Delay must be between 0 and 100000000 seconds.")
 
 
 # --- Wrapper Function (play_macro) ---
@@ -711,18 +1361,26 @@ def play_macro(
     repeat_times=1,
     delay_between_repeats=0.5,
     # removed stop_key argument, as it's now global to the singleton
+    optimize=CONSTANTS.OPTIMIZE_MACROS,
+    variables=None,
 ):
-    """Plays a macro file using the singleton PyMacroRecordLib instance."""
+    """
+    Plays a macro file using the singleton PyMacroRecordLib instance.
+    With optimize=True the events go through optimize_macro when loaded.
+    variables binds ${name} placeholders in typeText events, e.g.
+    play_macro("find_patient.pmr", variables={"mrn": mrn}).
+    """
     if not os.path.exists(file_name):
-        print(f"Macro file not found: {file_name}", file=sys.stderr)
+        logger.error("Macro file not found: %s", file_name)
         return False
 
     pmr_lib = PyMacroRecordLib()  # Get the singleton
 
     # --- NEW: Check if main loop stop was already requested ---
     if pmr_lib.should_main_loop_stop():
-        print(
-            f"Skipping macro '{os.path.basename(file_name)}' as main loop stop is requested."
+        logger.debug(
+            "Skipping macro '%s' as main loop stop is requested.",
+            os.path.basename(file_name),
         )
         return False  # Don't even try to play if stop is already active
 
@@ -733,30 +1391,125 @@ def play_macro(
     # pmr_lib.set_stop_key(stop_key) # REMOVED - stop key is global now
 
     # Load and play
-    if pmr_lib.load_macro_file(file_name):
-        print(f"Playing macro '{os.path.basename(file_name)}'...")
-        pmr_lib.start_playback()  # Start the engine thread
+    if pmr_lib.load_macro_file(file_name, optimize=optimize):
+        logger.debug("Playing macro '%s'...", os.path.basename(file_name))
+        with span(logger, "play_macro", macro=os.path.basename(file_name)):
+            job = pmr_lib.start_playback(variables)  # Queue the run on the worker
+            if job is None:
+                logger.error(
+                    "Macro '%s' not played: playback could not start.",
+                    os.path.basename(file_name),
+                )
+                return False
 
-        # Wait for this specific playback run to finish OR main stop request
-        pmr_lib.wait_for_playback_to_finish()
+            # Wait for this specific playback run to finish OR main stop request
+            pmr_lib.wait_for_playback_to_finish(job=job)
 
         # Check AGAIN if main stop was requested DURING playback/wait
         if pmr_lib.should_main_loop_stop():
-            print(
-                f"Macro '{os.path.basename(file_name)}' interrupted by global stop request."
+            logger.debug(
+                "Macro '%s' interrupted by global stop request.",
+                os.path.basename(file_name),
             )
             return False  # Indicate it was stopped prematurely
 
-        print(f"Macro '{os.path.basename(file_name)}' finished.")
+        if job.failed:
+            logger.debug(
+                "Macro '%s' stopped early (error or wait timeout).",
+                os.path.basename(file_name),
+            )
+            return False
+
+        logger.debug("Macro '%s' finished.", os.path.basename(file_name))
         return True  # Indicate successful completion
     else:
-        print(f"Failed to load macro file: {file_name}", file=sys.stderr)
+        logger.error("Failed to load macro file: %s", file_name)
         return False
 
 
+_keyboard = None
+_keyboard_lock = RLock()
+
+
+def type_text(text, variables=None):
+    """
+    Types text in one burst, the way typeText events do, with ${name}
+    placeholders bound from variables.
+
+    Uses its own keyboard controller, so it neither needs nor starts the
+    playback engine and its global stop-key listener.
+    """
+    global _keyboard
+    if variables:
+        text = Template(text).substitute(variables)
+    if _keyboard is None:
+        with _keyboard_lock:
+            if _keyboard is None:
+                _keyboard = keyboard.Controller()
+    _keyboard.type(text)
+
+
+# --- Command Line ---
+def main(argv):
+    """
+    Macro file tools.
+
+        python macro.py optimize find_patient.pmr [-o OUT] [--max-idle 0.3] [--dry-run]
+        python macro.py convert find_patient.pmr find_patient.pmrb   # and back
+
+    Either command reads JSON or binary input; the output format follows the
+    output file's extension (.pmrb for binary).
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="macro.py", description="Macro file tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    optimize = commands.add_parser(
+        "optimize", help="Collapse cursor moves and cap idle gaps in a .pmr file."
+    )
+    optimize.add_argument("file")
+    optimize.add_argument("-o", "--output", help="Write here instead of in place.")
+    optimize.add_argument("--max-idle", type=float, default=MAX_IDLE_GAP)
+    optimize.add_argument(
+        "--dry-run", action="store_true", help="Only print the timing reports."
+    )
+    convert = commands.add_parser(
+        "convert", help="Convert between JSON (.pmr) and binary (.pmrb) macros."
+    )
+    convert.add_argument("file")
+    convert.add_argument("output", help="Ends in .pmrb for binary, else JSON.")
+    args = parser.parse_args(argv)
+
+    if args.command == "optimize":
+        macro_data = read_macro_file(args.file)
+        optimized = optimize_macro(macro_data, max_idle=args.max_idle)
+        print(f"Before ({args.file}):")
+        print(format_timing_report(timing_report(macro_data)))
+        print("After:")
+        print(format_timing_report(timing_report(optimized)))
+        if not args.dry_run:
+            output = args.output or args.file
+            write_macro_file(optimized, output)
+            print(f"Wrote {output}")
+    elif args.command == "convert":
+        macro_data = read_macro_file(args.file)
+        write_macro_file(macro_data, args.output)
+        print(
+            f"Wrote {args.output} ({len(macro_data['events'])} events, "
+            f"{os.path.getsize(args.file)} -> {os.path.getsize(args.output)} bytes)"
+        )
+    return 0
+
+
 # --- Example Usage (Modified) ---
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main(sys.argv[1:]))
+
     import time
+    from tracing import configure_tracing
+
+    configure_tracing(level="INFO")
 
     # ... (dummy macro file creation remains the same) ...
     dummy_macro_file = "checkpsmapet.pmr"
@@ -17,6 +17,9 @@ pmr_lib.set_stop_key("esc")  # Ensure your desired stop key is set globally
 # Good practice to reset before starting a long loop
 pmr_lib.reset_main_loop_stop_request()
 
+# Load fingerprints, templates and saved template locations once
+epic.init()
+
 print(f"--- Starting Main Processing Loop ---")
 print(f"Press '{pmr_lib.stop_key}' at any time to stop the script.")
 
@@ -39,7 +42,9 @@ for i in range(800):
 
             no_psma_pet = utils.retry_till_false(
                 lambda: find_text_on_screen(
-                    "No results found for", region=(175, 375, 930, 960)
+                    "No results found for",
+                    region=(175, 375, 930, 960),
+                    fuzzy=True,
                 ),
                 retries=2,
                 delay=0.75,
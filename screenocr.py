@@ -1,8 +1,32 @@
 import mss
+import numpy as np
 import pytesseract
 from PIL import Image
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+import hashlib
+import os
+import queue
+import logging
+import threading
+import time
 import sys
 import re
+from tracing import span
+
+try:
+    import tesserocr  # Optional: in-process Tesseract API, avoids a subprocess per call
+except ImportError:
+    tesserocr = None
+
+try:
+    import xxhash  # Optional: faster frame hashing for the perception cache
+except ImportError:
+    xxhash = None
+
+logger = logging.getLogger(__name__)
 
 # --- Configuration (Optional but Recommended) ---
 # On Windows, you might need to uncomment and set the correct path:
@@ -10,13 +34,22 @@ import re
 # On Linux/macOS, Tesseract is often found automatically if installed and in the system PATH.
 
 
+_tesseract_verified = False
+
+
 def check_tesseract_installed():
     """Checks if the Tesseract OCR engine is accessible."""
+    global _tesseract_verified
+    if _tesseract_verified or get_ocr_backend().name == "tesserocr":
+        # Already verified, or the engine is loaded in-process
+        return True
     try:
         pytesseract.get_tesseract_version()
-        # print("Tesseract is installed and accessible.") # Optional: uncomment for verbose confirmation
+        _tesseract_verified = True
+        logger.debug("Tesseract is installed and accessible.")
         return True
     except pytesseract.TesseractNotFoundError:
+        # Setup problem the user must fix: keep the full guidance on stderr
         print("\n--- TESSERACT ERROR ---", file=sys.stderr)
         print(
             "Tesseract OCR engine not found or not in your system's PATH.",
@@ -38,11 +71,1151 @@ def check_tesseract_installed():
         print("---", file=sys.stderr)
         return False
     except Exception as e:
-        print(
-            f"An unexpected error occurred while checking for Tesseract: {e}",
-            file=sys.stderr,
+        logger.error("An unexpected error occurred while checking for Tesseract: %s", e)
+        return False
+
+
+# --- Fuzzy Matching ---
+# Minimum similarity (1 - edit distance / phrase length) for a fuzzy match.
+FUZZY_THRESHOLD = 0.85
+
+FuzzyMatch = namedtuple("FuzzyMatch", "score text distance")
+
+
+def bounded_edit_distance(a, b, max_distance):
+    """
+    Levenshtein distance between two strings, giving up early past max_distance.
+
+    Returns:
+        int: The distance, or max_distance + 1 if it exceeds the bound.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            )
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+def fuzzy_search(phrase, text, threshold=FUZZY_THRESHOLD):
+    """
+    Finds the closest approximate occurrence of a phrase in OCR text.
+
+    The text is tokenised per line and compared against windows of one token
+    fewer to one token more than the phrase, ignoring case and whitespace, so
+    misread characters and split or merged words still match.
+
+    Args:
+        phrase (str): The phrase to look for.
+        text (str): OCR output to search.
+        threshold (float): Minimum similarity in [0, 1] to accept.
+
+    Returns:
+        FuzzyMatch or None: Best (score, matched text, distance), or None if no
+                            window reaches the threshold.
+    """
+    target = "".join(phrase.lower().split())
+    if not target:
+        return None
+    max_distance = int(len(target) * (1 - threshold))
+    n = len(phrase.split())
+    best = None
+    for line in text.splitlines():
+        tokens = line.split()
+        for size in range(max(1, n - 1), n + 2):
+            for start in range(len(tokens) - size + 1):
+                window = tokens[start : start + size]
+                candidate = "".join(window).lower()
+                distance = bounded_edit_distance(candidate, target, max_distance)
+                if distance > max_distance:
+                    continue
+                if best is None or distance < best.distance:
+                    score = 1 - distance / len(target)
+                    best = FuzzyMatch(score, " ".join(window), distance)
+                    if distance == 0:
+                        return best
+    return best
+
+
+# --- OCR Results ---
+# One recognised word. Boxes are in image pixels; `line` identifies the text line
+# (block, paragraph, line) the word belongs to.
+OcrWord = namedtuple("OcrWord", "text conf left top width height line")
+
+
+class OcrResult:
+    """
+    Words recognised in one capture, with their boxes and confidences.
+
+    A single OCR pass can answer presence checks (`contains`), extractions
+    (`findall`) and locations (`locate`) without recognising the image again.
+
+    Args:
+        words (list[OcrWord]): Recognised words in reading order.
+        origin (tuple): Screen coordinates of the image's top-left corner.
+        scale (float): Image pixels per screen point (2.0 on Retina captures).
+        image (PIL.Image, optional): The captured image the words came from.
+    """
+
+    def __init__(self, words, origin=(0, 0), scale=1.0, image=None):
+        self.words = list(words)
+        self.origin = origin
+        self.scale = scale
+        self.image = image
+        self._text = None
+
+    @property
+    def lines(self):
+        """Words grouped by text line, in reading order."""
+        lines = OrderedDict()
+        for word in self.words:
+            lines.setdefault(word.line, []).append(word)
+        return list(lines.values())
+
+    @property
+    def text(self):
+        """Full text: words joined by spaces, lines by newlines."""
+        if self._text is None:
+            self._text = "\n".join(
+                " ".join(word.text for word in line) for line in self.lines
+            )
+        return self._text
+
+    @property
+    def mean_confidence(self):
+        if not self.words:
+            return 0.0
+        return sum(word.conf for word in self.words) / len(self.words)
+
+    def contains(self, phrase, use_regex=False, fuzzy=False, threshold=FUZZY_THRESHOLD):
+        """
+        Case-insensitive presence check. Raises re.error for an invalid regex.
+
+        With fuzzy=True a phrase also matches when OCR misread a few characters
+        (see fuzzy_search); ignored for regex patterns.
+        """
+        if use_regex:
+            return re.search(phrase, self.text, re.IGNORECASE) is not None
+        if phrase.lower() in self.text.lower():
+            return True
+        if not fuzzy:
+            return False
+        match = self.fuzzy_match(phrase, threshold)
+        if match is None:
+            return False
+        logger.debug("Fuzzy match '%s' (score %.2f).", match.text, match.score)
+        return True
+
+    def fuzzy_match(self, phrase, threshold=FUZZY_THRESHOLD):
+        """Returns the best approximate FuzzyMatch of a phrase, or None."""
+        return fuzzy_search(phrase, self.text, threshold)
+
+    def findall(self, pattern):
+        """Returns all case-insensitive regex matches in the text."""
+        return re.findall(pattern, self.text, re.IGNORECASE)
+
+    def locate(self, phrase, use_regex=False):
+        """
+        Finds the screen box of the first occurrence of a phrase.
+
+        Matches are searched line by line, so a phrase cannot span two lines.
+
+        Returns:
+            tuple or None: (left, top, right, bottom) in screen coordinates.
+        """
+        pattern = phrase if use_regex else re.escape(phrase)
+        for line in self.lines:
+            starts, offset = [], 0
+            for word in line:
+                starts.append(offset)
+                offset += len(word.text) + 1
+            match = re.search(
+                pattern, " ".join(word.text for word in line), re.IGNORECASE
+            )
+            if not match:
+                continue
+            hit = [
+                word
+                for word, start in zip(line, starts)
+                if start < match.end() and start + len(word.text) > match.start()
+            ]
+            return self.to_screen(
+                (
+                    min(word.left for word in hit),
+                    min(word.top for word in hit),
+                    max(word.left + word.width for word in hit),
+                    max(word.top + word.height for word in hit),
+                )
+            )
+        return None
+
+    def within(self, region):
+        """Returns a result holding only the words whose centre lies in a screen region."""
+        left, top, right, bottom = region
+        words = []
+        for word in self.words:
+            x, y = self.to_screen_point(
+                word.left + word.width / 2, word.top + word.height / 2
+            )
+            if left <= x <= right and top <= y <= bottom:
+                words.append(word)
+        return OcrResult(words, origin=self.origin, scale=self.scale, image=self.image)
+
+    def to_screen_point(self, x, y):
+        """Maps image pixel coordinates to screen coordinates."""
+        return (self.origin[0] + x / self.scale, self.origin[1] + y / self.scale)
+
+    def to_screen(self, box):
+        """Maps an image pixel box (left, top, right, bottom) to screen coordinates."""
+        return self.to_screen_point(box[0], box[1]) + self.to_screen_point(
+            box[2], box[3]
         )
+
+
+# --- OCR Backends ---
+class PytesseractBackend:
+    """Runs OCR through pytesseract, which starts a `tesseract` process per call."""
+
+    name = "pytesseract"
+
+    def warm(self):
+        pass  # Nothing to preload: every call starts its own process
+
+    def image_to_words(self, img):
+        data = pytesseract.image_to_data(img, output_type=pytesseract.Output.DICT)
+        words = []
+        for i, text in enumerate(data["text"]):
+            text = text.strip()
+            if not text or float(data["conf"][i]) < 0:
+                continue  # Page/block/line rows carry no text
+            words.append(
+                OcrWord(
+                    text,
+                    float(data["conf"][i]),
+                    data["left"][i],
+                    data["top"][i],
+                    data["width"][i],
+                    data["height"][i],
+                    (data["block_num"][i], data["par_num"][i], data["line_num"][i]),
+                )
+            )
+        return words
+
+
+class TesserocrBackend:
+    """
+    Runs OCR in-process through tesserocr.
+
+    Each thread gets its own warm PyTessBaseAPI handle (the API is not thread-safe),
+    so the language model is loaded once per thread instead of once per call.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, lang="eng"):
+        if tesserocr is None:
+            raise ImportError("tesserocr is not installed")
+        self.lang = lang
+        self._local = threading.local()
+        self._api()  # Fail early if the engine or its language data is missing
+
+    def warm(self):
+        """Loads the calling thread's engine ahead of its first OCR call."""
+        self._api()
+
+    def _api(self):
+        api = getattr(self._local, "api", None)
+        if api is None:
+            api = tesserocr.PyTessBaseAPI(lang=self.lang)
+            self._local.api = api
+        return api
+
+    def image_to_words(self, img):
+        api = self._api()
+        api.SetImage(img)
+        try:
+            api.Recognize()
+            words = []
+            line = -1
+            level = tesserocr.RIL.WORD
+            for it in tesserocr.iterate_level(api.GetIterator(), level):
+                if it.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+                    line += 1
+                text = (it.GetUTF8Text(level) or "").strip()
+                box = it.BoundingBox(level)
+                if not text or box is None:
+                    continue
+                left, top, right, bottom = box
+                words.append(
+                    OcrWord(
+                        text,
+                        it.Confidence(level),
+                        left,
+                        top,
+                        right - left,
+                        bottom - top,
+                        line,
+                    )
+                )
+            return words
+        finally:
+            api.Clear()
+
+
+_ocr_backend = None
+_ocr_backend_lock = threading.Lock()
+
+
+def set_ocr_backend(name):
+    """
+    Selects the OCR backend used by all screen searches.
+
+    Args:
+        name (str): "tesserocr" (in-process) or "pytesseract" (subprocess per call).
+
+    Returns:
+        bool: True if the requested backend is now active, False if it could not be
+              initialised (the current backend is kept).
+    """
+    global _ocr_backend
+    try:
+        if name == "tesserocr":
+            backend = TesserocrBackend()
+        elif name == "pytesseract":
+            backend = PytesseractBackend()
+        else:
+            logger.error("Unknown OCR backend '%s'.", name)
+            return False
+    except Exception as e:
+        logger.warning("Could not initialise OCR backend '%s': %s", name, e)
         return False
+    with _ocr_backend_lock:
+        _ocr_backend = backend
+    return True
+
+
+def get_ocr_backend():
+    """Returns the active OCR backend, preferring tesserocr when it is available."""
+    global _ocr_backend
+    if _ocr_backend is None:
+        with _ocr_backend_lock:
+            if _ocr_backend is None:
+                try:
+                    _ocr_backend = TesserocrBackend()
+                except Exception:
+                    _ocr_backend = PytesseractBackend()
+    return _ocr_backend
+
+
+# --- Perception Cache ---
+class PerceptionCache:
+    """
+    Content-addressed LRU cache for perception results (OCR text, template hits).
+
+    Keys start with a digest of the captured pixels, so an unchanged screen region
+    returns the previous result instead of running Tesseract or a template search
+    again. Thread-safe; tracks hit/miss counters.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute):
+        """Returns the cached value for `key`, calling `compute()` on a miss."""
+        with self._lock:
+            value = self._entries.get(key, self._MISSING)
+            if value is not self._MISSING:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+
+        value = compute()  # Not under the lock: OCR/matching can take a while
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._entries),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+perception_cache = PerceptionCache()
+
+
+def image_digest(img):
+    """Returns a fast content hash of a PIL image's raw pixel bytes."""
+    data = img.tobytes()
+    if xxhash is not None:
+        digest = xxhash.xxh3_128_hexdigest(data)
+    else:
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    return (img.mode, img.size, digest)
+
+
+# --- OCR Preprocessing ---
+class OcrPreprocessor:
+    """
+    Vectorised image clean-up applied before OCR.
+
+    Stages (each optional): grayscale, rescale so text lines are about
+    `target_text_height` pixels tall, inversion so text ends up dark on a light
+    background, and Otsu or adaptive thresholding. Wall-clock time of
+    each stage of the last run is kept in `timings` (milliseconds).
+
+    Args:
+        grayscale (bool): Convert to 8-bit luminance.
+        target_text_height (int, optional): Desired text line height in pixels.
+            The current height is estimated from the row profile of the image;
+            None disables rescaling.
+        threshold (str, optional): "otsu", "adaptive" or None.
+        invert (bool or str): True/False to force, "auto" to decide per text
+            line: a line whose background is dark (dark UI themes) is inverted,
+            so a light banner on a dark page keeps its dark text.
+        adaptive_block (int): Window size in pixels for adaptive thresholding.
+        adaptive_offset (int): Amount subtracted from the local mean.
+    """
+
+    MIN_SCALE = 0.25
+    MAX_SCALE = 4.0
+
+    def __init__(
+        self,
+        grayscale=True,
+        target_text_height=None,
+        threshold="otsu",
+        invert=False,
+        adaptive_block=31,
+        adaptive_offset=10,
+    ):
+        if threshold not in ("otsu", "adaptive", None):
+            raise ValueError(f"Unknown threshold method: {threshold}")
+        if threshold and not grayscale:
+            raise ValueError("Thresholding requires grayscale=True")
+        self.grayscale = grayscale
+        self.target_text_height = target_text_height
+        self.threshold = threshold
+        self.invert = invert
+        self.adaptive_block = adaptive_block
+        self.adaptive_offset = adaptive_offset
+        self.timings = {}
+
+    @property
+    def signature(self):
+        """Hashable description of the configuration, used in cache keys."""
+        return (
+            self.grayscale,
+            self.target_text_height,
+            self.threshold,
+            self.invert,
+            self.adaptive_block,
+            self.adaptive_offset,
+        )
+
+    def __call__(self, img):
+        timings = {}
+        start = time.perf_counter()
+
+        def lap(stage):
+            nonlocal start
+            now = time.perf_counter()
+            timings[stage] = (now - start) * 1000
+            start = now
+
+        arr = np.asarray(img)
+        if self.grayscale and arr.ndim == 3:
+            arr = to_grayscale(arr)
+            lap("grayscale")
+
+        if self.target_text_height and arr.ndim == 2:
+            height = estimate_text_height(arr)
+            if height:
+                scale = min(
+                    max(self.target_text_height / height, self.MIN_SCALE),
+                    self.MAX_SCALE,
+                )
+                if abs(scale - 1.0) > 0.1:
+                    size = (
+                        max(1, round(arr.shape[1] * scale)),
+                        max(1, round(arr.shape[0] * scale)),
+                    )
+                    resample = Image.LANCZOS if scale < 1 else Image.BICUBIC
+                    arr = np.asarray(Image.fromarray(arr).resize(size, resample))
+            lap("rescale")
+
+        if self.invert == "auto" and arr.ndim == 2:
+            # Tesseract expects dark text on a light background. Within a line the
+            # background is the majority of pixels, so a dark median there means
+            # light-on-dark text; each line is judged (and flipped) on its own.
+            arr = arr.copy()
+            for top, bottom in text_lines(arr):
+                band = arr[top:bottom]
+                if np.median(band) < 127:
+                    arr[top:bottom] = 255 - band
+            lap("invert")
+        elif self.invert is True:
+            arr = 255 - arr
+            lap("invert")
+
+        if self.threshold == "otsu":
+            arr = np.where(arr > otsu_threshold(arr), 255, 0).astype(np.uint8)
+            lap("threshold")
+        elif self.threshold == "adaptive":
+            arr = adaptive_threshold(arr, self.adaptive_block, self.adaptive_offset)
+            lap("threshold")
+
+        self.timings = timings
+        return Image.fromarray(arr)
+
+
+def to_grayscale(arr):
+    """Converts an RGB array to 8-bit luminance (ITU-R 601 weights)."""
+    gray = arr[..., 0] * 0.299 + arr[..., 1] * 0.587 + arr[..., 2] * 0.114
+    return gray.astype(np.uint8)
+
+
+def otsu_threshold(gray):
+    """Returns the Otsu threshold of an 8-bit grayscale array."""
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    weight_bg = np.cumsum(hist)
+    weight_fg = weight_bg[-1] - weight_bg
+    cum_mean = np.cumsum(hist * np.arange(256))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_bg = cum_mean / weight_bg
+        mean_fg = (cum_mean[-1] - cum_mean) / weight_fg
+        between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    return int(np.nanargmax(between)) if np.isfinite(between).any() else 127
+
+
+def adaptive_threshold(gray, block=31, offset=10):
+    """Thresholds each pixel against the mean of its block x block neighbourhood."""
+    half = block // 2
+    padded = np.pad(gray.astype(np.int64), half + 1, mode="edge")
+    integral = padded.cumsum(axis=0).cumsum(axis=1)
+    h, w = gray.shape
+    window_sum = (
+        integral[block : block + h, block : block + w]
+        - integral[:h, block : block + w]
+        - integral[block : block + h, :w]
+        + integral[:h, :w]
+    )
+    local_mean = window_sum / (block * block)
+    return np.where(gray > local_mean - offset, 255, 0).astype(np.uint8)
+
+
+# A row crossing text flips between ink and background many times; rows that only
+# cross borders, rules or smooth artwork flip a few times at most
+MIN_TEXT_ROW_TRANSITIONS = 6
+# Runs of text rows taller than this fraction of the image are artwork, not lines
+MAX_LINE_FRACTION = 0.25
+
+
+def text_rows(gray):
+    """
+    Flags the rows of a grayscale image that cross text: rows whose Otsu
+    binarisation changes value at least MIN_TEXT_ROW_TRANSITIONS times.
+    """
+    binary = gray > otsu_threshold(gray)
+    transitions = np.count_nonzero(binary[:, 1:] != binary[:, :-1], axis=1)
+    return transitions >= MIN_TEXT_ROW_TRANSITIONS
+
+
+def text_lines(gray):
+    """
+    Returns (top, bottom) row ranges of the text lines in a grayscale image.
+
+    Consecutive text rows (see text_rows) form a line. Runs shorter than 3 rows
+    (speckles) or taller than MAX_LINE_FRACTION of the image (textured artwork,
+    gradients) are dropped.
+    """
+    rows = text_rows(gray).astype(np.int8)
+    edges = np.diff(np.concatenate(([0], rows, [0])))
+    tops = np.flatnonzero(edges == 1)
+    bottoms = np.flatnonzero(edges == -1)
+    heights = bottoms - tops
+    keep = (heights >= 3) & (heights <= MAX_LINE_FRACTION * gray.shape[0])
+    return list(zip(tops[keep].tolist(), bottoms[keep].tolist()))
+
+
+def estimate_text_height(gray):
+    """
+    Estimates the typical text line height of a grayscale image in pixels.
+
+    Returns the median height of text_lines, or None if no plausible line was
+    found, in which case the image should not be rescaled.
+    """
+    heights = [bottom - top for top, bottom in text_lines(gray)]
+    return float(np.median(heights)) if heights else None
+
+
+_ocr_preprocessor = None
+
+
+def set_ocr_preprocessor(preprocessor):
+    """
+    Sets the preprocessing applied to every image before OCR.
+
+    Args:
+        preprocessor (OcrPreprocessor or None): None sends raw captures to OCR.
+    """
+    global _ocr_preprocessor
+    _ocr_preprocessor = preprocessor
+
+
+def ocr_data(img, use_cache=True, origin=(0, 0), scale=1.0):
+    """
+    Recognises an image with the active OCR backend in a single pass.
+
+    Args:
+        img (PIL.Image): The image to recognise.
+        use_cache (bool): If True, identical pixels reuse the previously recognised words.
+        origin (tuple): Screen coordinates of the image's top-left corner.
+        scale (float): Image pixels per screen point.
+
+    Returns:
+        OcrResult: Words with boxes (in `img` pixels) and confidences.
+    """
+    backend = get_ocr_backend()
+    preprocessor = _ocr_preprocessor
+
+    def _ocr():
+        if not preprocessor:
+            return tuple(backend.image_to_words(img))
+        prepared = preprocessor(img)
+        words = backend.image_to_words(prepared)
+        # Map boxes back to the original image if the preprocessor rescaled it
+        sx = img.width / prepared.width
+        sy = img.height / prepared.height
+        return tuple(
+            word._replace(
+                left=round(word.left * sx),
+                top=round(word.top * sy),
+                width=round(word.width * sx),
+                height=round(word.height * sy),
+            )
+            for word in words
+        )
+
+    if use_cache:
+        signature = preprocessor.signature if preprocessor else None
+        words = perception_cache.get_or_compute(
+            ("ocr", backend.name, signature, image_digest(img)), _ocr
+        )
+    else:
+        words = _ocr()
+    return OcrResult(words, origin=origin, scale=scale, image=img)
+
+
+def ocr_image(img, use_cache=True):
+    """Extracts the text of an image with the active OCR backend."""
+    return ocr_data(img, use_cache=use_cache).text
+
+
+# --- OCR Worker Pool ---
+class OcrPool:
+    """
+    Thread pool that recognises independent images concurrently.
+
+    Threads are enough here: tesserocr releases the GIL while recognising and
+    pytesseract waits on a subprocess. Each worker warms its own engine when it
+    starts, and at most `max_pending` images are queued or running at once;
+    further submits block until a slot frees up.
+
+    Args:
+        max_workers (int, optional): Worker threads (defaults to the CPU count).
+        max_pending (int, optional): Queue depth bound (defaults to 2 x workers).
+    """
+
+    def __init__(self, max_workers=None, max_pending=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="ocr",
+            initializer=self._warm_worker,
+        )
+        self._slots = threading.BoundedSemaphore(max_pending or 2 * self.max_workers)
+
+    @staticmethod
+    def _warm_worker():
+        try:
+            get_ocr_backend().warm()
+        except Exception as e:
+            logger.warning("Could not warm OCR worker: %s", e)
+
+    def submit(self, img, origin=(0, 0), scale=1.0):
+        """
+        Queues an image for recognition.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the image's OcrResult.
+        """
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(ocr_data, img, True, origin, scale)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def gather(self, futures, timeout=None):
+        """
+        Waits for submitted futures, in order.
+
+        Returns:
+            list: OcrResult per future, or None for those that failed.
+        """
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result(timeout=timeout))
+            except Exception as e:
+                logger.error("Error during OCR: %s", e)
+                results.append(None)
+        return results
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+_ocr_pool = None
+_ocr_pool_lock = threading.Lock()
+
+
+def get_ocr_pool():
+    """Returns the process-wide OcrPool, creating it on first use."""
+    global _ocr_pool
+    if _ocr_pool is None:
+        with _ocr_pool_lock:
+            if _ocr_pool is None:
+                _ocr_pool = OcrPool()
+    return _ocr_pool
+
+
+# --- Capture Session ---
+# Seconds a grabbed full-monitor frame may be reused for further region queries.
+FRAME_TTL = 0.05
+
+
+class CaptureSession:
+    """
+    Long-lived screen capture session.
+
+    Keeps one mss handle per thread (mss handles are not thread-safe) and caches
+    the most recent full-monitor frame for `frame_ttl` seconds. Region queries
+    issued close together are cropped from that shared frame instead of each
+    opening a new mss context and grabbing the screen again.
+
+    Frames pinned by hold() belong to the holding thread: other threads'
+    grabs and invalidate() calls never replace them.
+    """
+
+    def __init__(self, frame_ttl=FRAME_TTL):
+        self.frame_ttl = frame_ttl
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self._frames = {}  # monitor_num -> (grabbed_at, monitor dict, PIL image)
+        self.grabs = 0
+        self.reuses = 0
+
+    def _sct(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = mss.mss()
+            self._local.sct = sct
+        return sct
+
+    @property
+    def monitors(self):
+        return self._sct().monitors
+
+    def resolve_monitor(self, monitor_num):
+        """Validates a monitor number, falling back to the primary monitor."""
+        monitors = self.monitors
+        if monitor_num < 0 or monitor_num >= len(monitors):
+            logger.warning(
+                "Monitor number %s is invalid. Available monitors: %s (0=all, 1=primary, ...). Falling back to monitor 1 (primary).",
+                monitor_num,
+                len(monitors),
+            )
+            monitor_num = 1  # Default to primary
+            if monitor_num >= len(monitors):  # If only monitor 0 (all) exists
+                monitor_num = 0
+        return monitor_num
+
+    def _is_fresh(self, grabbed_at):
+        return time.monotonic() - grabbed_at <= self.frame_ttl
+
+    def grab_monitor(self, monitor_num=1):
+        """
+        Returns the full frame of a monitor, reusing the cached one while it is
+        fresh (or, inside hold(), the one this thread's block pinned).
+
+        Returns:
+            tuple: (monitor dict, PIL.Image)
+        """
+        held = getattr(self._local, "held", None)
+        if held is not None and monitor_num in held:
+            with self._lock:
+                self.reuses += 1
+            return held[monitor_num]
+
+        with self._lock:
+            cached = self._frames.get(monitor_num)
+            if cached and self._is_fresh(cached[0]):
+                self.reuses += 1
+                frame = cached[1], cached[2]
+            else:
+                frame = None
+        if frame is None:
+            frame = self._grab_fresh(monitor_num)
+        if held is not None:
+            # Pinned from here on, whatever happens to the shared cache
+            held[monitor_num] = frame
+        return frame
+
+    def _grab_fresh(self, monitor_num):
+        """Grabs a monitor now and makes it the shared cached frame."""
+        sct = self._sct()
+        monitor = sct.monitors[monitor_num]
+        sct_img = sct.grab(monitor)
+        img = Image.frombytes("RGB", sct_img.size, sct_img.rgb)
+
+        with self._lock:
+            self._frames[monitor_num] = (time.monotonic(), monitor, img)
+            self.grabs += 1
+        return monitor, img
+
+    def _monitor_containing(self, region):
+        left, top, right, bottom = region
+        monitors = self.monitors
+        for monitor_num in range(1, len(monitors)):
+            mon = monitors[monitor_num]
+            if (
+                left >= mon["left"]
+                and top >= mon["top"]
+                and right <= mon["left"] + mon["width"]
+                and bottom <= mon["top"] + mon["height"]
+            ):
+                return monitor_num
+        return None
+
+    def grab(self, region=None, monitor_num=1):
+        """
+        Returns an image of a region or a whole monitor.
+
+        Args:
+            region (tuple, optional): (left, top, right, bottom) in screen coordinates.
+                                      Cropped from the cached monitor frame when the
+                                      region lies within a single monitor.
+            monitor_num (int): Monitor to capture when no region is given.
+
+        Returns:
+            PIL.Image: The captured image (at device pixel density).
+        """
+        if region is None:
+            return self.grab_monitor(self.resolve_monitor(monitor_num))[1]
+
+        left, top, right, bottom = region
+        containing = self._monitor_containing(region)
+        if containing is None:
+            # Region spans monitors or lies off-screen: grab it directly, uncached.
+            sct_img = self._sct().grab(
+                {
+                    "left": left,
+                    "top": top,
+                    "width": right - left,
+                    "height": bottom - top,
+                }
+            )
+            return Image.frombytes("RGB", sct_img.size, sct_img.rgb)
+
+        monitor, img = self.grab_monitor(containing)
+        # Frames are captured at device pixels, regions are given in screen points.
+        scale_x = img.width / monitor["width"]
+        scale_y = img.height / monitor["height"]
+        box = (
+            round((left - monitor["left"]) * scale_x),
+            round((top - monitor["top"]) * scale_y),
+            round((right - monitor["left"]) * scale_x),
+            round((bottom - monitor["top"]) * scale_y),
+        )
+        return img.crop(box)
+
+    @contextmanager
+    def hold(self):
+        """
+        Serves every query the calling thread makes inside the block from one
+        frame per monitor: the shared cached frame if it is still fresh when the
+        block first uses that monitor, otherwise a new grab. Once pinned it is
+        kept regardless of TTL, other threads or invalidate().
+
+        Use around a group of checks that must all look at the same screen state,
+        e.g. a verify step probing several regions.
+        """
+        outer = getattr(self._local, "held", None)
+        if outer is None:
+            self._local.held = {}
+        try:
+            yield self
+        finally:
+            if outer is None:
+                self._local.held = None
+
+    def invalidate(self):
+        """
+        Drops the shared cached frames, e.g. right after an action changed the
+        screen. Frames pinned by an active hold() are kept.
+        """
+        with self._lock:
+            self._frames.clear()
+
+    def close(self):
+        """Closes the calling thread's mss handle and drops cached frames."""
+        sct = getattr(self._local, "sct", None)
+        if sct is not None:
+            sct.close()
+            self._local.sct = None
+        self.invalidate()
+
+
+_capture_session = None
+_capture_session_lock = threading.Lock()
+
+
+def get_capture_session():
+    """Returns the process-wide CaptureSession, creating it on first use."""
+    global _capture_session
+    if _capture_session is None:
+        with _capture_session_lock:
+            if _capture_session is None:
+                _capture_session = CaptureSession()
+    return _capture_session
+
+
+# --- Debug Frame Sink ---
+class DebugFrameSink:
+    """
+    Persists debug screenshots on a background thread.
+
+    Frames are handed to a writer thread through a bounded queue and saved as
+    fast-compressed PNGs, so diagnostics never stall the caller on encoding or
+    disk I/O. When the queue is full the frame is dropped and counted instead.
+
+    The most recent frames are also kept in memory (unencoded) so they can be
+    written out after the fact, e.g. when an exception aborts an iteration.
+
+    Args:
+        directory (str): Where frames are written, one timestamped file each.
+        mode (str): "on_failure" persists only frames submitted as failed,
+                    "always" persists every frame, "off" ignores them.
+        max_queue (int): Frames waiting to be written before new ones are dropped.
+        keep_recent (int): Frames remembered for dump_recent().
+        compress_level (int): PNG zlib level (1 = fastest).
+    """
+
+    def __init__(
+        self,
+        directory="debug_frames",
+        mode="on_failure",
+        max_queue=8,
+        keep_recent=5,
+        compress_level=1,
+    ):
+        if mode not in ("on_failure", "always", "off"):
+            raise ValueError(f"Unknown debug frame mode: {mode}")
+        self.directory = directory
+        self.mode = mode
+        self.compress_level = compress_level
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._recent = deque(maxlen=keep_recent)
+        self._lock = threading.Lock()
+        self._writer = None
+
+    def submit(self, img, label, failed=False):
+        """Records a frame; it is persisted if failed or the mode is "always"."""
+        if self.mode == "off" or img is None:
+            return
+        self._recent.append((time.time(), label, img))
+        if failed or self.mode == "always":
+            self._enqueue(time.time(), label, img)
+
+    def dump_recent(self, reason="exception"):
+        """Persists the frames remembered in memory, tagged with a reason."""
+        if self.mode == "off":
+            return
+        for timestamp, label, img in list(self._recent):
+            self._enqueue(timestamp, f"{reason}_{label}", img)
+        self._recent.clear()
+
+    def flush(self, timeout=None):
+        """Blocks until every queued frame has been written (or timeout elapses)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _enqueue(self, timestamp, label, img):
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait((timestamp, label, img))
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_writer(self):
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(
+                    target=self._write_frames, name="debug-frames", daemon=True
+                )
+                self._writer.start()
+
+    def _write_frames(self):
+        while True:
+            timestamp, label, img = self._queue.get()
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(timestamp))
+                millis = int(timestamp * 1000) % 1000
+                safe_label = re.sub(r"[^\w-]+", "_", str(label)).strip("_")[:40]
+                filename = os.path.join(
+                    self.directory, f"{stamp}-{millis:03d}-{safe_label}.png"
+                )
+                img.save(filename, compress_level=self.compress_level)
+                self.written += 1
+            except Exception as e:
+                logger.warning("Could not save debug frame: %s", e)
+            finally:
+                self._queue.task_done()
+
+
+debug_sink = DebugFrameSink()
+
+
+def _capture_image(region=None, monitor_num=1):
+    """
+    Captures a region or monitor through the shared CaptureSession.
+
+    Returns:
+        tuple: (PIL.Image, origin, scale), or (None, None, None) if the capture
+               failed. origin is the screen position of the image's top-left
+               corner and scale the number of image pixels per screen point.
+    """
+    try:
+        session = get_capture_session()
+        if region:
+            logger.debug("Capturing region: %s", region)
+        else:
+            monitor_num = session.resolve_monitor(monitor_num)
+            monitors = session.monitors
+            if monitor_num == 0 and len(monitors) > 1:
+                logger.debug(
+                    "Capturing all monitors combined. This might yield unexpected OCR results."
+                )
+            elif monitor_num == 1 and len(monitors) > 1:
+                logger.debug("Capturing primary monitor.")
+            elif monitor_num > 0:
+                logger.debug("Capturing monitor %s.", monitor_num)
+            else:  # Only monitor 0 exists
+                logger.debug("Capturing the only available monitor.")
+
+        with span(logger, "capture", region=region):
+            img = session.grab(region=region, monitor_num=monitor_num)
+        logger.debug("Screenshot captured.")
+
+        if region:
+            origin, width = (region[0], region[1]), region[2] - region[0]
+        else:
+            monitor = session.monitors[monitor_num]
+            origin, width = (monitor["left"], monitor["top"]), monitor["width"]
+        scale = img.width / width if width else 1.0
+        return img, origin, scale
+
+    except Exception as e:
+        logger.error("Error taking screenshot: %s", e)
+        return None, None, None
+
+
+def read_screen(monitor_num=1, debug_save=False, region=None):
+    """
+    Takes a screenshot of a specified monitor or region and OCRs it once.
+
+    The returned OcrResult can be searched, have text extracted from it and
+    locate phrases on screen, all from the same OCR pass.
+
+    Args:
+        monitor_num (int): The monitor number (1=primary, 2=secondary, 0=all).
+        debug_save (bool): If True, hands the frame to the debug sink when OCR fails.
+                           Callers that run a check on the result submit the frame
+                           themselves, with the check's outcome.
+        region (tuple, optional): Region to capture as (left, top, right, bottom) coordinates.
+                                    If provided, will only capture this region.
+
+    Returns:
+        OcrResult or None: The recognised words, or None if an error occurred
+                           during screenshot or OCR.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Attempting to capture %s...",
+            "region" if region else f"monitor {monitor_num}",
+        )
+    img, origin, scale = _capture_image(region=region, monitor_num=monitor_num)
+    if img is None:
+        return None  # Indicate failure
+
+    logger.debug("Performing OCR...")
+    try:
+        with span(logger, "ocr", region=region):
+            result = ocr_data(img, origin=origin, scale=scale)
+        logger.debug("OCR complete.")
+        return result
+
+    except pytesseract.TesseractNotFoundError:
+        # This should ideally be caught by check_tesseract_installed, but double-check
+        logger.error(
+            "Tesseract OCR engine not found or not in PATH during OCR process."
+        )
+    except Exception as e:
+        logger.error("Error during OCR: %s", e)
+    if debug_save:
+        debug_sink.submit(img, "ocr_error", failed=True)
+    return None  # Indicate failure
 
 
 def capture_and_ocr(
@@ -51,6 +1224,8 @@ def capture_and_ocr(
     debug_save=False,
     region=None,
     use_regex=False,
+    fuzzy=False,
+    fuzzy_threshold=FUZZY_THRESHOLD,
 ):
     """
     Internal helper: Takes a screenshot of a specified monitor or region, performs OCR,
@@ -59,10 +1234,12 @@ def capture_and_ocr(
     Args:
         target_phrase (str): The text or regex pattern to search for (case-insensitive).
         monitor_num (int): The monitor number (1=primary, 2=secondary, 0=all).
-        debug_save (bool): If True, saves the screenshot for debugging.
+        debug_save (bool): If True, hands the screenshot to the debug sink.
         region (tuple, optional): Region to capture as (left, top, right, bottom) coordinates.
                                     If provided, will only capture this region.
         use_regex (bool): If True, interprets target_phrase as a regex pattern.
+        fuzzy (bool): If True, tolerates OCR misreads in target_phrase (not regex).
+        fuzzy_threshold (float): Minimum similarity in [0, 1] for a fuzzy match.
 
     Returns:
         tuple: (bool, str or None)
@@ -70,97 +1247,22 @@ def capture_and_ocr(
                 - str: The full extracted text if successful, None if an error occurred
                         during screenshot or OCR.
     """
-    print(
-        f"Attempting to capture {'region' if region else f'monitor {monitor_num}'}..."
-    )
-    try:
-        with mss.mss() as sct:
-            # If region is specified, use it directly
-            if region:
-                left, top, right, bottom = region
-                monitor = {
-                    "left": left,
-                    "top": top,
-                    "width": right - left,
-                    "height": bottom - top,
-                }
-                print(f"Capturing region: {region}")
-            else:
-                # Adjust monitor selection logic slightly for clarity
-                monitors = sct.monitors
-                if monitor_num < 0 or monitor_num >= len(monitors):
-                    print(
-                        f"Warning: Monitor number {monitor_num} is invalid. Available monitors: {len(monitors)} (0=all, 1=primary, ...). Falling back to monitor 1 (primary).",
-                        file=sys.stderr,
-                    )
-                    monitor_num = 1  # Default to primary
-                    if monitor_num >= len(monitors):  # If only monitor 0 (all) exists
-                        monitor_num = 0
-
-                if monitor_num == 0 and len(monitors) > 1:
-                    print(
-                        "Capturing all monitors combined. This might yield unexpected OCR results."
-                    )
-                elif monitor_num == 1 and len(monitors) > 1:
-                    print("Capturing primary monitor.")
-                elif monitor_num > 0:
-                    print(f"Capturing monitor {monitor_num}.")
-                else:  # Only monitor 0 exists
-                    print("Capturing the only available monitor.")
-
-                monitor = monitors[monitor_num]
-
-            # Capture the screen
-            sct_img = sct.grab(monitor)
-            print("Screenshot captured.")
-
-            # Convert to PIL Image
-            img = Image.frombytes("RGB", sct_img.size, sct_img.rgb)
-
-            if debug_save:
-                try:
-                    filename = "screenshot_debug.png"
-                    img.save(filename)
-                    print(f"Screenshot saved for debugging as {filename}")
-                except Exception as save_e:
-                    print(
-                        f"Warning: Could not save debug screenshot: {save_e}",
-                        file=sys.stderr,
-                    )
-
-    except Exception as e:
-        print(f"Error taking screenshot: {e}", file=sys.stderr)
+    result = read_screen(monitor_num=monitor_num, debug_save=debug_save, region=region)
+    if result is None:
         return False, None  # Indicate failure
 
-    print("Performing OCR...")
+    logger.debug("Searching for '%s' (case-insensitive)...", target_phrase)
     try:
-        # Perform OCR using pytesseract
-        extracted_text = pytesseract.image_to_string(img)
-        print("OCR complete.")
-
-    except pytesseract.TesseractNotFoundError:
-        # This should ideally be caught by check_tesseract_installed, but double-check
-        print(
-            "ERROR: Tesseract OCR engine not found or not in PATH during OCR process.",
-            file=sys.stderr,
+        found = result.contains(
+            target_phrase, use_regex=use_regex, fuzzy=fuzzy, threshold=fuzzy_threshold
         )
+    except re.error as regex_error:
+        logger.error("Invalid regex pattern: %s", regex_error)
         return False, None
-    except Exception as e:
-        print(f"Error during OCR: {e}", file=sys.stderr)
-        return False, None  # Indicate failure
-
-    print(f"Searching for '{target_phrase}' (case-insensitive)...")
-    # Check if the target phrase or regex pattern exists
-    if use_regex:
-        try:
-            found = re.search(target_phrase, extracted_text, re.IGNORECASE) is not None
-        except re.error as regex_error:
-            print(f"Invalid regex pattern: {regex_error}", file=sys.stderr)
-            return False, None
-    else:
-        found = target_phrase.lower() in extracted_text.lower()
 
-    return found, extracted_text  # Return status and full text
+    if debug_save:
+        debug_sink.submit(result.image, target_phrase, failed=not found)
+    return found, result.text  # Return status and full text
 
 
 # --- The Wrapper Function ---
@@ -170,6 +1272,8 @@ def find_text_on_screen(
     save_screenshot=False,
     region=None,
     use_regex=False,
+    fuzzy=False,
+    fuzzy_threshold=FUZZY_THRESHOLD,
 ):
     """
     Captures the specified monitor's screen or region, performs OCR, and checks if
@@ -180,24 +1284,24 @@ def find_text_on_screen(
         monitor_to_capture (int): The monitor number to capture
                                     (1: primary, 2: secondary, etc., 0: all monitors).
                                     Defaults to 1 (primary). Ignored if region is specified.
-        save_screenshot (bool): If True, saves the captured screenshot as
-                                'screenshot_debug.png'. Defaults to False.
+        save_screenshot (bool): If True, hands the captured screenshot to the debug
+                                sink (see DebugFrameSink). Defaults to False.
         region (tuple, optional): Region to capture as (left, top, right, bottom) coordinates.
                                     If provided, will only capture this region instead of the full monitor.
         use_regex (bool): If True, interprets search_term as a regex pattern.
+        fuzzy (bool): If True, a phrase with a few OCR misread characters still
+                      counts as found. Ignored when use_regex is True.
+        fuzzy_threshold (float): Minimum similarity in [0, 1] for a fuzzy match.
 
     Returns:
         bool: True if the search_term is found, False otherwise (including
                 if Tesseract is not found or errors occur during capture/OCR).
     """
-    print(f"\n--- Starting screen search for: '{search_term}' ---")
-    if region:
-        print(f"Searching within region: {region}")
+    logger.debug("Starting screen search for: '%s' (region %s)", search_term, region)
 
     # 1. Prerequisite check
     if not check_tesseract_installed():
-        print("Search aborted because Tesseract is not available.")
-        print("--- Search finished (failed) ---")
+        logger.warning("Search aborted because Tesseract is not available.")
         return False
 
     # 2. Call the core function
@@ -207,27 +1311,27 @@ def find_text_on_screen(
         debug_save=save_screenshot,
         region=region,
         use_regex=use_regex,
+        fuzzy=fuzzy,
+        fuzzy_threshold=fuzzy_threshold,
     )
 
-    print(
-        "EXTRACTED TEXT", extracted_text
-    )  # Optional: Print the extracted text for debugging
+    logger.debug("EXTRACTED TEXT %r", extracted_text)
 
     # 3. Interpret the results
     if extracted_text is None:
         # An error occurred in capture_and_ocr before the search could happen
-        print(
-            f"Search for '{search_term}' failed due to an error during screen capture or OCR."
+        logger.warning(
+            "Search for '%s' failed due to an error during screen capture or OCR.",
+            search_term,
         )
         result = False
     elif found_status:
-        print(f"SUCCESS: Found '{search_term}' on the screen.")
+        logger.info("Found '%s' on the screen.", search_term)
         result = True
     else:
-        print(f"INFO: Did not find '{search_term}' on the screen.")
+        logger.info("Did not find '%s' on the screen.", search_term)
         result = False
 
-    print("--- Screen search finished ---")
     return result
 
 
@@ -244,7 +1348,7 @@ def find_text_and_return(
     Args:
         regex_pattern (str): The regex pattern to search for and extract.
         monitor_num (int): The monitor number (1=primary, 2=secondary, 0=all).
-        debug_save (bool): If True, saves the screenshot for debugging.
+        debug_save (bool): If True, hands the screenshot to the debug sink.
         region (tuple, optional): Region to capture as (left, top, right, bottom) coordinates.
                                     If provided, will only capture this region.
 
@@ -252,100 +1356,159 @@ def find_text_and_return(
         list: A list of all matches found using the regex pattern.
               Returns an empty list if no matches are found or an error occurs.
     """
-    print(
-        f"Attempting to capture {'region' if region else f'monitor {monitor_num}'} for regex extraction..."
-    )
+    result = read_screen(monitor_num=monitor_num, debug_save=debug_save, region=region)
+    if result is None:
+        return []  # Indicate failure
+    matches = extract_matches(result, regex_pattern)
+    if debug_save:
+        debug_sink.submit(result.image, regex_pattern, failed=not matches)
+    return matches
+
+
+def extract_matches(result, regex_pattern):
+    """
+    Extracts text matching a regex pattern from an existing OcrResult.
+
+    Returns:
+        list: All matches, or an empty list if none are found or the pattern is invalid.
+    """
+    logger.debug("Extracting text using regex pattern: '%s'...", regex_pattern)
     try:
-        with mss.mss() as sct:
-            # If region is specified, use it directly
-            if region:
-                left, top, right, bottom = region
-                monitor = {
-                    "left": left,
-                    "top": top,
-                    "width": right - left,
-                    "height": bottom - top,
-                }
-                print(f"Capturing region: {region}")
-            else:
-                # Adjust monitor selection logic slightly for clarity
-                monitors = sct.monitors
-                if monitor_num < 0 or monitor_num >= len(monitors):
-                    print(
-                        f"Warning: Monitor number {monitor_num} is invalid. Available monitors: {len(monitors)} (0=all, 1=primary, ...). Falling back to monitor 1 (primary).",
-                        file=sys.stderr,
-                    )
-                    monitor_num = 1  # Default to primary
-                    if monitor_num >= len(monitors):  # If only monitor 0 (all) exists
-                        monitor_num = 0
+        matches = result.findall(regex_pattern)
+        if matches:
+            logger.info("Regex matches found: %s", matches)
+        else:
+            logger.info("No matches found using the provided regex pattern.")
+        return matches
+    except re.error as regex_error:
+        logger.error("Invalid regex pattern: %s", regex_error)
+        return []  # Indicate failure
 
-                if monitor_num == 0 and len(monitors) > 1:
-                    print(
-                        "Capturing all monitors combined. This might yield unexpected OCR results."
-                    )
-                elif monitor_num == 1 and len(monitors) > 1:
-                    print("Capturing primary monitor.")
-                elif monitor_num > 0:
-                    print(f"Capturing monitor {monitor_num}.")
-                else:  # Only monitor 0 exists
-                    print("Capturing the only available monitor.")
 
-                monitor = monitors[monitor_num]
+def read_regions(regions, monitor_num=1, debug_save=False):
+    """
+    Captures several regions from one frame and OCRs them concurrently.
 
-            # Capture the screen
-            sct_img = sct.grab(monitor)
-            print("Screenshot captured.")
+    Args:
+        regions (list): (left, top, right, bottom) tuples; None captures the whole
+                        monitor. Duplicates are only recognised once.
+        monitor_num (int): Monitor to capture for a None region.
+        debug_save (bool): If True, hands regions whose OCR failed to the debug sink.
 
-            # Convert to PIL Image
-            img = Image.frombytes("RGB", sct_img.size, sct_img.rgb)
+    Returns:
+        dict: Maps each distinct region to its OcrResult, or None if its capture
+              or OCR failed.
+    """
+    pool = get_ocr_pool()
+    images, futures = {}, {}
+    with get_capture_session().hold():
+        for region in regions:
+            region = tuple(region) if region else None
+            if region in futures:
+                continue
+            img, origin, scale = _capture_image(region=region, monitor_num=monitor_num)
+            images[region] = img
+            futures[region] = pool.submit(img, origin, scale) if img else None
 
-            if debug_save:
-                try:
-                    filename = "screenshot_debug.png"
-                    img.save(filename)
-                    print(f"Screenshot saved for debugging as {filename}")
-                except Exception as save_e:
-                    print(
-                        f"Warning: Could not save debug screenshot: {save_e}",
-                        file=sys.stderr,
-                    )
+    pending = [future for future in futures.values() if future is not None]
+    done = iter(pool.gather(pending))
+    results = {
+        region: next(done) if future is not None else None
+        for region, future in futures.items()
+    }
+    if debug_save:
+        for region, result in results.items():
+            if result is None and images[region] is not None:
+                debug_sink.submit(images[region], "ocr_error", failed=True)
+    return results
 
-    except Exception as e:
-        print(f"Error taking screenshot: {e}", file=sys.stderr)
-        return []  # Indicate failure
 
-    print("Performing OCR...")
-    try:
-        # Perform OCR using pytesseract
-        extracted_text = pytesseract.image_to_string(img)
-        print("OCR complete.")
+# --- Batch Probes ---
+@lru_cache(maxsize=256)
+def _compile_probe(pattern):
+    """Compiles a probe phrase (matched literally) into a case-insensitive regex."""
+    return re.compile(re.escape(pattern), re.IGNORECASE)
 
-    except pytesseract.TesseractNotFoundError:
-        # This should ideally be caught by check_tesseract_installed, but double-check
-        print(
-            "ERROR: Tesseract OCR engine not found or not in PATH during OCR process.",
-            file=sys.stderr,
+
+def probe_many(
+    probes,
+    monitor_num=1,
+    debug_save=False,
+    fuzzy=False,
+    fuzzy_threshold=FUZZY_THRESHOLD,
+):
+    """
+    Evaluates several text probes against a single screen capture.
+
+    The screen is grabbed once, each distinct region is OCR'd once (concurrently,
+    see read_regions), and every probe's pattern is matched against the text of
+    its region. A state check that needs several signals costs one capture
+    instead of one per phrase.
+
+    Args:
+        probes (list): (pattern, region) tuples. A str pattern is matched as a
+                       literal phrase (case-insensitive); a compiled `re.Pattern`
+                       is matched as a regex. region is (left, top, right, bottom)
+                       or None for the whole monitor.
+        monitor_num (int): Monitor to capture for probes without a region.
+        debug_save (bool): If True, hands each region to the debug sink; a region
+                           counts as failed when none of its probes matched.
+        fuzzy (bool): If True, literal phrases tolerate a few OCR misreads.
+        fuzzy_threshold (float): Minimum similarity in [0, 1] for a fuzzy match.
+
+    Returns:
+        list: One bool per probe, in the order given, so the same phrase can be
+              probed in several regions. Probes whose region could not be
+              captured or OCR'd are False.
+    """
+    if not check_tesseract_installed():
+        logger.warning("Probes aborted because Tesseract is not available.")
+        return [False] * len(probes)
+
+    ocr_results = read_regions(
+        [region for _, region in probes], monitor_num=monitor_num
+    )
+    texts = {
+        region: result.text if result is not None else None
+        for region, result in ocr_results.items()
+    }
+
+    results = []
+    matched_regions = set()
+    for pattern, region in probes:
+        text = texts[tuple(region) if region else None]
+        compiled = (
+            pattern if isinstance(pattern, re.Pattern) else _compile_probe(pattern)
         )
-        return []
-    except Exception as e:
-        print(f"Error during OCR: {e}", file=sys.stderr)
-        return []  # Indicate failure
+        found = text is not None and compiled.search(text) is not None
+        if not found and fuzzy and text is not None and isinstance(pattern, str):
+            found = fuzzy_search(pattern, text, fuzzy_threshold) is not None
+        results.append(found)
+        if found:
+            matched_regions.add(tuple(region) if region else None)
+    logger.info(
+        "Probe results: %s",
+        [
+            (getattr(pattern, "pattern", pattern), region, found)
+            for (pattern, region), found in zip(probes, results)
+        ],
+    )
 
-    print(f"Extracting text using regex pattern: '{regex_pattern}'...")
-    try:
-        matches = re.findall(regex_pattern, extracted_text, re.IGNORECASE)
-        if matches:
-            print(f"Regex matches found: {matches}")
-        else:
-            print("No matches found using the provided regex pattern.")
-        return matches
-    except re.error as regex_error:
-        print(f"Invalid regex pattern: {regex_error}", file=sys.stderr)
-        return []  # Indicate failure
+    if debug_save:
+        for region, result in ocr_results.items():
+            if result is not None:
+                label = f"probe_{region}"
+                debug_sink.submit(
+                    result.image, label, failed=region not in matched_regions
+                )
+    return results
 
 
 # --- Main Execution Example ---
 if __name__ == "__main__":
+    from tracing import configure_tracing
+
+    configure_tracing(level="DEBUG")
 
     # --- Example Usage ---
 
@@ -0,0 +1,171 @@
+"""
+Screen-state fingerprints: recognise known screens without OCR.
+
+Each known state (e.g. "home", "lookup") is described by one or more reference
+regions recorded from a live screen. A region is stored as a difference hash
+(dHash) of its downsampled grayscale pixels, so classifying the live screen is a
+handful of small crops and Hamming distances - a few milliseconds - instead of
+an OCR pass or a full-screen template search.
+
+Record references from a terminal while the application shows the state:
+
+    python screenstate.py assets/fingerprints.json record home 0 0 1728 120
+"""
+
+from collections import namedtuple
+import json
+import logging
+import os
+import sys
+
+import numpy as np
+from PIL import Image
+
+from screenocr import get_capture_session
+
+logger = logging.getLogger(__name__)
+
+# Side of the dHash grid; each region hashes to HASH_SIZE * HASH_SIZE bits.
+HASH_SIZE = 16
+# Mean fraction of differing bits below which a state counts as a match.
+MAX_DISTANCE = 0.12
+# Required gap to the runner-up state before a match is unambiguous.
+MIN_MARGIN = 0.05
+
+StateMatch = namedtuple("StateMatch", "label distance ambiguous")
+
+
+def dhash(img, hash_size=HASH_SIZE):
+    """
+    Computes the difference hash of an image.
+
+    Returns:
+        int: hash_size * hash_size bits, set where a pixel is brighter than its
+             right-hand neighbour in the downsampled grayscale image.
+    """
+    small = img.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hash_distance(a, b, hash_size=HASH_SIZE):
+    """Fraction of differing bits between two hashes (0 = identical)."""
+    return (a ^ b).bit_count() / (hash_size * hash_size)
+
+
+class FingerprintStore:
+    """
+    Labelled screen-state fingerprints, persisted as JSON.
+
+    Args:
+        path (str, optional): JSON file to load from and save to.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.states = {}  # label -> [{"region": (l, t, r, b), "hash": int}]
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def load(self, path):
+        with open(path, "r") as f:
+            data = json.load(f)
+        self.states = {
+            label: [
+                {"region": tuple(ref["region"]), "hash": int(ref["hash"], 16)}
+                for ref in refs
+            ]
+            for label, refs in data.get("states", {}).items()
+        }
+
+    def save(self, path=None):
+        path = path or self.path
+        data = {
+            "hash_size": HASH_SIZE,
+            "states": {
+                label: [
+                    {"region": list(ref["region"]), "hash": f"{ref['hash']:x}"}
+                    for ref in refs
+                ]
+                for label, refs in self.states.items()
+            },
+        }
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+
+    def record(self, label, region):
+        """Adds the live screen's content at region as a reference for label."""
+        img = get_capture_session().grab(region=region)
+        self.states.setdefault(label, []).append(
+            {"region": tuple(region), "hash": dhash(img)}
+        )
+
+    def classify_state(
+        self, candidates=None, max_distance=MAX_DISTANCE, min_margin=MIN_MARGIN
+    ):
+        """
+        Compares the live screen against the stored states.
+
+        Args:
+            candidates (list, optional): Labels to consider (default: all).
+            max_distance (float): Largest distance accepted as a match.
+            min_margin (float): Required gap between the best and second-best state.
+
+        Returns:
+            StateMatch: Best label and its distance (mean fraction of differing
+                        bits over its regions). ambiguous is True when there is
+                        no state, the best is too far, or the runner-up is too
+                        close; callers should then fall back to OCR or templates.
+        """
+        labels = [
+            label for label in (candidates or self.states) if label in self.states
+        ]
+        if not labels:
+            return StateMatch(None, 1.0, True)
+
+        session = get_capture_session()
+        hashes = {}  # Regions shared between states are hashed once
+        scores = []
+        with session.hold():
+            for label in labels:
+                refs = self.states[label]
+                total = 0.0
+                for ref in refs:
+                    region = ref["region"]
+                    if region not in hashes:
+                        hashes[region] = dhash(session.grab(region=region))
+                    total += hash_distance(hashes[region], ref["hash"])
+                scores.append((total / len(refs), label))
+
+        scores.sort()
+        best_distance, best_label = scores[0]
+        runner_up = scores[1][0] if len(scores) > 1 else 1.0
+        ambiguous = (
+            best_distance > max_distance or runner_up - best_distance < min_margin
+        )
+        logger.debug(
+            "Screen state: %s (distance %.3f, ambiguous=%s)",
+            best_label,
+            best_distance,
+            ambiguous,
+        )
+        return StateMatch(best_label, best_distance, ambiguous)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[2] not in ("record", "classify"):
+        print(
+            "Usage: python screenstate.py STORE.json record LABEL LEFT TOP RIGHT BOTTOM\n"
+            "       python screenstate.py STORE.json classify"
+        )
+        sys.exit(1)
+
+    store = FingerprintStore(sys.argv[1])
+    if sys.argv[2] == "record":
+        label, region = sys.argv[3], tuple(int(v) for v in sys.argv[4:8])
+        store.record(label, region)
+        store.save()
+        print(f"Recorded '{label}' at {region} in {sys.argv[1]}")
+    else:
+        print(store.classify_state())
@@ -0,0 +1,411 @@
+"""
+Clipboard backends.
+
+Every backend exposes get_text/set_text plus a change counter: change_count()
+returns a number that increases whenever the clipboard is replaced, and
+wait_for_change(since) blocks until it moves past a previously read value. Native
+backends get notified by the system; the others fall back to comparing contents.
+
+    since = get_clipboard().expect_change()
+    # ... trigger a copy in the application ...
+    get_clipboard().wait_for_change(since, timeout=2.0)
+"""
+
+import hashlib
+import logging
+import os
+import select
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+
+try:
+    import Xlib.threaded  # noqa: F401  (makes Display usable from several threads)
+    from Xlib import X, Xatom
+    from Xlib import display as xdisplay
+    from Xlib.ext import xfixes
+    from Xlib.protocol import event as xevent
+except ImportError:
+    xdisplay = None
+
+try:
+    from AppKit import NSPasteboard, NSPasteboardTypeString
+except ImportError:
+    NSPasteboard = None
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks when a backend has to poll for changes
+CHANGE_POLL_INTERVALS = (0.01, 0.02, 0.05, 0.1)
+
+
+class ClipboardBackend(ABC):
+    """
+    Base class. Subclasses implement get_text and set_text, and override
+    change_count/wait_for_change (and native_counter) when the platform can
+    report changes.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self._observed_digest = None
+        self._observed_count = 0
+        self._observe_lock = threading.Lock()
+
+    @abstractmethod
+    def get_text(self) -> str:
+        """Returns the clipboard text ("" if empty or not text)."""
+
+    @abstractmethod
+    def set_text(self, text: str):
+        """Replaces the clipboard contents with text."""
+
+    @property
+    def native_counter(self) -> bool:
+        """True if change_count comes from the system rather than from contents."""
+        return False
+
+    def expect_change(self) -> int:
+        """
+        Returns the value to pass to wait_for_change after triggering a copy.
+
+        Content-digest counters cannot see a copy of the text already on the
+        clipboard, so backends without a native counter clear it first.
+        """
+        if not self.native_counter:
+            self.set_text("")
+        return self.change_count()
+
+    def change_count(self) -> int:
+        """
+        Returns a counter that increases whenever the clipboard contents change.
+
+        This default reads the clipboard and counts content changes between calls,
+        so it only notices changes that alter the text.
+        """
+        digest = hashlib.blake2b(self.get_text().encode(), digest_size=16).digest()
+        with self._observe_lock:
+            if digest != self._observed_digest:
+                if self._observed_digest is not None:
+                    self._observed_count += 1
+                self._observed_digest = digest
+            return self._observed_count
+
+    def wait_for_change(self, since: int, timeout: float = 5.0) -> bool:
+        """
+        Blocks until change_count() differs from since.
+
+        Returns:
+            bool: True if the clipboard changed, False if the timeout expired.
+        """
+        deadline = time.monotonic() + timeout
+        poll = 0
+        while True:
+            if self.change_count() != since:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            interval = CHANGE_POLL_INTERVALS[min(poll, len(CHANGE_POLL_INTERVALS) - 1)]
+            time.sleep(min(interval, remaining))
+            poll += 1
+
+
+class CommandClipboard(ClipboardBackend):
+    """
+    Clipboard through copy/paste commands (pbcopy/pbpaste, xclip, wl-copy...).
+
+    Every call starts a process; prefer a native backend where available.
+    """
+
+    name = "command"
+
+    def __init__(self, copy_command, paste_command):
+        super().__init__()
+        self.copy_command = copy_command
+        self.paste_command = paste_command
+
+    def get_text(self) -> str:
+        result = subprocess.run(self.paste_command, text=True, capture_output=True)
+        return result.stdout
+
+    def set_text(self, text: str):
+        subprocess.run(self.copy_command, text=True, input=text)
+
+
+class MacClipboard(CommandClipboard):
+    """
+    macOS general pasteboard.
+
+    With PyObjC installed the pasteboard is used in-process and changeCount is
+    the system's own counter; otherwise pbcopy/pbpaste are used.
+    """
+
+    name = "macos"
+
+    def __init__(self):
+        super().__init__("pbcopy", "pbpaste")
+        self._pasteboard = (
+            NSPasteboard.generalPasteboard() if NSPasteboard is not None else None
+        )
+
+    def get_text(self) -> str:
+        if self._pasteboard is None:
+            return super().get_text()
+        return self._pasteboard.stringForType_(NSPasteboardTypeString) or ""
+
+    def set_text(self, text: str):
+        if self._pasteboard is None:
+            return super().set_text(text)
+        self._pasteboard.clearContents()
+        self._pasteboard.setString_forType_(text, NSPasteboardTypeString)
+
+    @property
+    def native_counter(self) -> bool:
+        return self._pasteboard is not None
+
+    def change_count(self) -> int:
+        if self._pasteboard is None:
+            return super().change_count()
+        return int(self._pasteboard.changeCount())
+
+
+class X11Clipboard(ClipboardBackend):
+    """
+    X11 CLIPBOARD selection, spoken to directly through python-xlib.
+
+    A background thread owns one connection: it answers other clients' requests
+    for text we set, and counts XFixes selection-owner changes so waiting for a
+    copy needs no polling. Reads use a second connection.
+
+    Text we set is served in one piece (no INCR), which is ample for the dates
+    and short lists written by this project.
+    """
+
+    name = "x11"
+
+    def __init__(self, display_name=None):
+        super().__init__()
+        self._owner_display = xdisplay.Display(display_name)
+        self._reader_display = xdisplay.Display(display_name)
+        self._owner_window = self._create_window(self._owner_display)
+        self._reader_window = self._create_window(self._reader_display)
+        self._reader_lock = threading.Lock()
+
+        atom = self._owner_display.intern_atom
+        self.CLIPBOARD = atom("CLIPBOARD")
+        self.TARGETS = atom("TARGETS")
+        self.UTF8_STRING = atom("UTF8_STRING")
+        self.TEXT = atom("TEXT")
+        self.INCR = atom("INCR")
+        self.PROPERTY = atom("SCREENSCRIPT_CLIPBOARD")
+
+        self._text = None  # Contents while we own the selection
+        self._count = 0
+        self._changed = threading.Condition()
+
+        extension = self._owner_display.query_extension("XFIXES")
+        self._xfixes_event = None
+        if extension.present:
+            self._owner_display.xfixes_query_version()
+            self._owner_display.xfixes_select_selection_input(
+                self._owner_window,
+                self.CLIPBOARD,
+                xfixes.XFixesSetSelectionOwnerNotifyMask,
+            )
+            self._xfixes_event = extension.first_event + xfixes.XFixesSelectionNotify
+        self._owner_display.flush()
+
+        self._thread = threading.Thread(
+            target=self._serve, name="X11Clipboard", daemon=True
+        )
+        self._thread.start()
+
+    @staticmethod
+    def _create_window(display):
+        screen = display.screen()
+        return screen.root.create_window(
+            0, 0, 1, 1, 0, screen.root_depth, event_mask=X.PropertyChangeMask
+        )
+
+    # --- Owner side (background thread) ---
+
+    def _serve(self):
+        while True:
+            try:
+                event = self._owner_display.next_event()
+            except Exception as e:
+                logger.error("X11 clipboard connection lost: %s", e)
+                return
+            if event.type == X.SelectionRequest:
+                self._answer(event)
+            elif event.type == X.SelectionClear:
+                self._text = None
+            elif event.type == self._xfixes_event:
+                with self._changed:
+                    self._count += 1
+                    self._changed.notify_all()
+
+    def _answer(self, request):
+        prop = request.property or request.target
+        text = self._text
+        if text is None:
+            prop = X.NONE
+        elif request.target == self.TARGETS:
+            request.requestor.change_property(
+                prop,
+                Xatom.ATOM,
+                32,
+                [self.TARGETS, self.UTF8_STRING, Xatom.STRING, self.TEXT],
+            )
+        elif request.target in (self.UTF8_STRING, self.TEXT):
+            request.requestor.change_property(
+                prop, self.UTF8_STRING, 8, text.encode("utf-8")
+            )
+        elif request.target == Xatom.STRING:
+            request.requestor.change_property(
+                prop, Xatom.STRING, 8, text.encode("latin-1", "replace")
+            )
+        else:
+            prop = X.NONE
+
+        reply = xevent.SelectionNotify(
+            time=request.time,
+            requestor=request.requestor,
+            selection=request.selection,
+            target=request.target,
+            property=prop,
+        )
+        request.requestor.send_event(reply)
+        self._owner_display.flush()
+
+    def set_text(self, text: str):
+        self._text = text
+        self._owner_window.set_selection_owner(self.CLIPBOARD, X.CurrentTime)
+        self._owner_display.flush()
+
+    # --- Reader side ---
+
+    def _next_event(self, deadline):
+        """Next event on the reader connection, or None at the deadline."""
+        display = self._reader_display
+        while not display.pending_events():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            select.select([display], [], [], remaining)
+        return display.next_event()
+
+    def _read_incr(self, deadline):
+        """Collects a chunked (INCR) transfer; the owner sends empty data to end it."""
+        chunks = []
+        window = self._reader_window
+        while True:
+            event = self._next_event(deadline)
+            if event is None:
+                return None
+            if event.type != X.PropertyNotify or event.state != X.PropertyNewValue:
+                continue
+            if event.atom != self.PROPERTY:
+                continue
+            prop = window.get_full_property(self.PROPERTY, X.AnyPropertyType)
+            window.delete_property(self.PROPERTY)
+            self._reader_display.flush()
+            if prop is None or not prop.value:
+                return b"".join(chunks)
+            chunks.append(bytes(prop.value))
+
+    def get_text(self, timeout=1.0) -> str:
+        if self._text is not None:
+            return self._text
+
+        with self._reader_lock:
+            deadline = time.monotonic() + timeout
+            window = self._reader_window
+            window.convert_selection(
+                self.CLIPBOARD, self.UTF8_STRING, self.PROPERTY, X.CurrentTime
+            )
+            self._reader_display.flush()
+
+            while True:
+                event = self._next_event(deadline)
+                if event is None:
+                    logger.warning("Timed out reading the X11 clipboard")
+                    return ""
+                if event.type == X.SelectionNotify:
+                    break
+            if event.property == X.NONE:
+                return ""
+
+            prop = window.get_full_property(self.PROPERTY, X.AnyPropertyType)
+            window.delete_property(self.PROPERTY)
+            self._reader_display.flush()
+            if prop is None:
+                return ""
+            if prop.property_type == self.INCR:
+                data = self._read_incr(deadline) or b""
+            else:
+                data = bytes(prop.value)
+            return data.decode("utf-8", "replace")
+
+    # --- Change counter ---
+
+    @property
+    def native_counter(self) -> bool:
+        return self._xfixes_event is not None
+
+    def change_count(self) -> int:
+        if self._xfixes_event is None:
+            return super().change_count()
+        with self._changed:
+            return self._count
+
+    def wait_for_change(self, since: int, timeout: float = 5.0) -> bool:
+        if self._xfixes_event is None:
+            return super().wait_for_change(since, timeout)
+        with self._changed:
+            return self._changed.wait_for(lambda: self._count != since, timeout)
+
+
+def _default_backend():
+    if sys.platform == "darwin":
+        return MacClipboard()
+    if xdisplay is not None and os.environ.get("DISPLAY"):
+        try:
+            return X11Clipboard()
+        except Exception as e:
+            logger.warning("X11 clipboard unavailable (%s), using commands", e)
+    if shutil.which("wl-copy") and os.environ.get("WAYLAND_DISPLAY"):
+        return CommandClipboard(["wl-copy"], ["wl-paste", "--no-newline"])
+    if shutil.which("xclip"):
+        return CommandClipboard(
+            ["xclip", "-selection", "clipboard"],
+            ["xclip", "-selection", "clipboard", "-o"],
+        )
+    return CommandClipboard("pbcopy", "pbpaste")
+
+
+_clipboard = None
+_clipboard_lock = threading.Lock()
+
+
+def set_clipboard_backend(backend):
+    """Replaces the process-wide clipboard backend (e.g. with a custom one)."""
+    global _clipboard
+    with _clipboard_lock:
+        _clipboard = backend
+
+
+def get_clipboard():
+    """Returns the process-wide clipboard backend, choosing one on first use."""
+    global _clipboard
+    if _clipboard is None:
+        with _clipboard_lock:
+            if _clipboard is None:
+                _clipboard = _default_backend()
+                logger.debug("Using %s clipboard backend", _clipboard.name)
+    return _clipboard
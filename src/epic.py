@@ -1,14 +1,56 @@
-from macro import play_macro
-from screenocr import find_text_on_screen
+import logging
+from macro import play_macro, type_text
+from screenocr import find_text_on_screen, probe_many
+from screenstate import FingerprintStore
 from pathlib import Path
 from .utils import click, do_and_verify, find_and_click, find_image_on_screen
 from src import utils
 import pyautogui
+import threading
 import time
 
+logger = logging.getLogger(__name__)
+
 BASE_PATH = "/Users/yihein.chai/Documents/learn/screenscript/src"
 ASSETS_PATH = Path(BASE_PATH).parent / "assets"
 
+screen_states = None  # FingerprintStore, loaded by init()
+_init_lock = threading.Lock()
+
+
+def init():
+    """
+    Loads the Epic assets: screen fingerprints, every template decoded up front,
+    and the saved template locations. Call once at start-up; later calls do
+    nothing. Without it templates are decoded on first use and searched
+    screen-wide.
+    """
+    global screen_states
+    with _init_lock:
+        if screen_states is not None:
+            return
+        # Recorded with `python screenstate.py assets/fingerprints.json record ...`
+        states = FingerprintStore(str(ASSETS_PATH / "fingerprints.json"))
+        # Decode every template once, up front, rather than on each lookup
+        utils.templates.preload(ASSETS_PATH)
+        # Search where each button was last seen before scanning the whole screen
+        utils.templates.memory = utils.LocationMemory(
+            str(ASSETS_PATH / "template_locations.json")
+        )
+        screen_states = states
+
+
+def is_screen(state, asset):
+    """
+    Checks whether Epic shows the given state, by fingerprint when it is
+    unambiguous and by searching for the asset image otherwise.
+    """
+    init()
+    match = screen_states.classify_state()
+    if not match.ambiguous:
+        return match.label == state
+    return find_image_on_screen(str(ASSETS_PATH / asset))
+
 
 def close_patient():
     # Close the patient
@@ -17,7 +59,7 @@ def close_patient():
 
     def verify_success():
         # Verify that the patient is closed
-        patient_closed = find_image_on_screen(str(ASSETS_PATH / "homescreen.png"))
+        patient_closed = is_screen("home", "homescreen.png")
         return patient_closed
 
     do_and_verify(
@@ -33,7 +75,7 @@ def close_patient_lookup():
         find_and_click(str(ASSETS_PATH / "cancel.png"))
 
     def verify_success():
-        lookup_open = find_image_on_screen(str(ASSETS_PATH / "lookup.png"))
+        lookup_open = is_screen("lookup", "lookup.png")
         return not lookup_open
 
     result = do_and_verify(
@@ -46,11 +88,12 @@ def close_patient_lookup():
 def close_break_glass():
     # Close the break-the-glass
     def _close_break_glass():
-        coords = list(
-            pyautogui.locateAllOnScreen(str(ASSETS_PATH / "cancel.png"), confidence=0.8)
-        )
+        coords = [
+            match.box
+            for match in utils.locate_all(str(ASSETS_PATH / "cancel.png"), confidence=0.8)
+        ]
 
-        coords = sorted(coords, key=lambda box: box.left)
+        coords = sorted(coords, key=lambda box: box[0])
 
         click(coords[0][0] + 50, coords[0][1] + 25)
 
@@ -93,27 +136,22 @@ def view_found_patient():
 
     def verify_success():
         nonlocal glass_appeared, patient_deceased
-        # Verify that the patient is viewed
-        patient_viewed = find_image_on_screen(str(ASSETS_PATH / "chart_review.png"))
+        # Verify that the patient is viewed; one capture covers every outcome
+        chart_review = str(ASSETS_PATH / "chart_review.png")
+        break_glass = str(ASSETS_PATH / "break_glass.png")
+        open_dead_chart = str(ASSETS_PATH / "open_dead_chart.png")
+        hits = utils.detect_any([chart_review, break_glass, open_dead_chart])
 
-        if patient_viewed:
+        if chart_review in hits:
             return True
         else:
-            has_break_the_glass = find_image_on_screen(
-                str(ASSETS_PATH / "break_glass.png")
-            )
-
-            if has_break_the_glass:
+            if break_glass in hits:
                 close_break_glass()
                 close_patient_lookup()
                 glass_appeared = True
                 return True
 
-            is_patient_dead = find_image_on_screen(
-                str(ASSETS_PATH / "open_dead_chart.png")
-            )
-
-            if is_patient_dead:
+            if open_dead_chart in hits:
                 patient_deceased = True
                 view_dead_patient()
                 return True
@@ -143,7 +181,7 @@ def search_psma_pet():
     def verify_success():
         # Verify that the search was successful
         search_successful = find_text_on_screen(
-            "Search results for", region=(177, 175, 352, 204)
+            "Search results for", region=(177, 175, 352, 204), fuzzy=True
         )
         return search_successful
 
@@ -160,21 +198,18 @@ def find_patient():
     def verify_success():
         nonlocal non_existent_patient
 
-        not_searched_yet = find_text_on_screen(
-            "to get started", region=(24, 374, 900, 888)
-        )
-
-        patient_name_appeared = find_text_on_screen(
-            "Patient Name", region=(222, 382, 544, 497)
+        # All three checks look at the same screen: capture once, OCR each region once
+        not_searched_yet, patient_name_appeared, no_patient_found = probe_many(
+            [
+                ("to get started", (24, 374, 900, 888)),
+                ("Patient Name", (222, 382, 544, 497)),
+                ("No patients were found", (0, 373, 907, 827)),
+            ]
         )
 
         if not_searched_yet:
             return False
 
-        no_patient_found = find_text_on_screen(
-            "No patients were found", region=(0, 373, 907, 827)
-        )
-
         if no_patient_found:
             # If no patients were found, close the patient
             close_patient_lookup()
@@ -248,7 +283,7 @@ def find_patient_clipboard(mrn):
         find_and_click(str(ASSETS_PATH / "epic_live.png"))
         find_and_click(str(ASSETS_PATH / "patient_lookup.png"))
         time.sleep(0.5)
-        pyautogui.typewrite(mrn, interval=0.1)
+        type_text(mrn)
         find_and_click(str(ASSETS_PATH / "find_patient.png"))
 
     do_and_verify(
@@ -300,15 +335,13 @@ def view_imaging():
 
 def find_icons(type, confidence=0.9):
     try:
-        boxes = list(
-            pyautogui.locateAllOnScreen(
-                str(ASSETS_PATH / f"{type}_icon.png"), confidence=confidence
-            )
+        # Raw hits are clustered by score inside locate_all, keeping the best per icon
+        matches = utils.locate_all(
+            str(ASSETS_PATH / f"{type}_icon.png"), confidence=confidence
         )
-        icons = [(box.left + box.width // 2, box.top + box.height // 2) for box in boxes]
-        icons = utils.group_locations(icons)
+        icons = [(match.x, match.y) for match in matches]
     except Exception as e:
-        print(f"Error finding {type} icons: {e}")
+        logger.error("Error finding %s icons: %s", type, e)
         icons = []
     return icons
 
@@ -381,9 +414,16 @@ def copy_note_contents():
     if not result:
         return ""
 
+    # Wait for the copy itself, even when the note matches the clipboard already
+    copied_since = utils.expect_clipboard_change()
     result = do_and_verify(
         do_action=lambda: find_and_click(str(ASSETS_PATH / "copy_all.png")),
-        verify_success=lambda: len(utils.receive_from_clipboard()) > 0,
+        verify_success=lambda: utils.wait_for_clipboard_change(
+            copied_since, timeout=0.5
+        ),
+        # A counter that cannot move before the copy: no settle, no screen grabs
+        settle=0,
+        watch_screen=False,
     )
 
     if not result:
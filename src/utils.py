@@ -1,22 +1,174 @@
+import logging
 import time
 from typing import Callable
-import subprocess
 import pyautogui
 import math
+import threading
+import os
+import json
+import atexit
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
+from PIL import Image
+from screenocr import get_capture_session, image_digest, perception_cache
+from tracing import span
+from .clipboard import get_clipboard
+
+try:
+    import cv2  # Optional: faster matchTemplate, used when installed
+except ImportError:
+    cv2 = None
+
+logger = logging.getLogger(__name__)
 
 # Display scale factor: 2 for macOS Retina, 1 for non-Retina
 DISPLAY_SCALE = 2
 
 
-def retry_till_false(callback, retries=3, delay=1):
+# Only every Nth pixel in each direction is hashed by frame_digest
+FRAME_DIGEST_STEP = 4
+
+_last_frame_digest = (None, None)  # (frame, digest) of the last frame hashed
+
+
+def frame_digest(img):
+    """
+    Cheap content key for a captured frame.
+
+    Hashes a nearest-neighbour subsample (every FRAME_DIGEST_STEP-th pixel),
+    about 10 ms for a full Retina frame against ~85 ms for every byte; UI changes
+    worth detecting span far more pixels than that. The digest of the most
+    recent frame object is remembered, so repeated lookups against one capture
+    cost nothing.
+    """
+    global _last_frame_digest
+    last_img, last_digest = _last_frame_digest
+    if last_img is img:
+        return last_digest
+    small = img.resize(
+        (
+            max(1, img.width // FRAME_DIGEST_STEP),
+            max(1, img.height // FRAME_DIGEST_STEP),
+        ),
+        Image.NEAREST,
+    )
+    digest = image_digest(small)
+    _last_frame_digest = (img, digest)
+    return digest
+
+
+def _frame_signature(region=None):
+    """Grabs a fresh frame of region (primary monitor if None) and returns a cheap hash."""
+    session = get_capture_session()
+    session.invalidate()
+    return frame_digest(session.grab(region=region))
+
+
+# Seconds between verification polls; the last interval repeats until the timeout
+VERIFY_BACKOFF = (0.05, 0.05, 0.1, 0.2, 0.4)
+# Seconds after an action before the first check, so a state that has not yet
+# reacted to the action (e.g. a closing window still drawn) is not read as success
+VERIFY_SETTLE = 0.2
+
+# success: verified; attempts: actions performed; elapsed: seconds in total;
+# poll: which poll of the final attempt succeeded (1 = the first check), or None
+VerifyReport = namedtuple("VerifyReport", "success attempts elapsed poll")
+
+
+def _poll_until(condition, timeout, intervals, region=None, watch_screen=True):
+    """
+    Core of wait_until.
+
+    With watch_screen=False the condition is evaluated on every poll and no
+    frames are captured; use it for conditions that do not read the screen.
+
+    Returns:
+        int or None: Number of the poll on which the condition held, or None.
+    """
+    deadline = time.monotonic() + timeout
+    last_signature = None
+    poll = 0
+    while True:
+        poll += 1
+        signature = None  # None: evaluate on this poll
+        if watch_screen:
+            try:
+                signature = _frame_signature(region)
+            except Exception as e:
+                logger.error("Error capturing screen for change detection: %s", e)
+
+        evaluated = signature is None or signature != last_signature
+        if evaluated:
+            last_signature = signature
+            if condition():
+                return poll
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            if not evaluated and condition():
+                return poll
+            return None
+        interval = intervals[min(poll - 1, len(intervals) - 1)]
+        time.sleep(min(interval, remaining))
+
+
+def wait_until(
+    condition: Callable[[], bool],
+    timeout: float = 5.0,
+    poll_hint: float = 0.05,
+    region=None,
+    backoff=None,
+    watch_screen: bool = True,
+) -> bool:
+    """
+    Wait until condition() holds, re-checking only when the screen changes.
+
+    A cheap capture of the watched region is taken every poll_hint seconds and
+    the (expensive) condition is only re-evaluated when those pixels changed.
+    The condition is always evaluated once at the start and once more at the
+    deadline, so conditions that do not depend on the region (e.g. clipboard
+    contents) still get a final check.
+
+    Args:
+        condition: Check to run, e.g. an OCR or template lookup.
+        timeout: Maximum seconds to wait.
+        poll_hint: Seconds between cheap change-detection captures.
+        region: (left, top, right, bottom) to watch, or None for the primary monitor.
+        backoff: Optional sequence of intervals used instead of poll_hint;
+            the last one repeats.
+        watch_screen: False to skip change detection and evaluate every poll.
+
+    Returns:
+        bool: True as soon as the condition holds, False if the timeout expired.
+    """
+    intervals = tuple(backoff) if backoff else (poll_hint,)
+    return _poll_until(condition, timeout, intervals, region, watch_screen) is not None
+
+
+def retry_till_false(callback, retries=3, delay=1, backoff=VERIFY_BACKOFF, region=None):
+    """
+    Waits delay seconds, then re-checks callback until it returns a falsy value.
+
+    The first check still comes after delay, giving the UI time to settle. After
+    that the callback is polled on the backoff schedule (and only when the
+    watched region changed) for up to retries * delay seconds, the window the
+    fixed retries used to cover, instead of sleeping delay between checks.
+
+    Returns:
+        The callback's last result: falsy if it turned false in time.
+    """
     time.sleep(delay)
-    condition = callback()
-    for i in range(retries):
-        if not condition:
-            break
-        time.sleep(delay)
-        condition = callback()
-    return condition
+    result = None
+
+    def cleared():
+        nonlocal result
+        result = callback()
+        return not result
+
+    _poll_until(cleared, retries * delay, tuple(backoff), region)
+    return result
 
 
 def do_and_verify(
@@ -24,42 +176,96 @@ def do_and_verify(
     verify_success: Callable[[], bool],
     clean_up: Callable[[], None] = lambda: None,
     retries: int = 10,
+    verify_timeout: float = 1.5,
+    backoff=VERIFY_BACKOFF,
+    deadline: float = None,
+    on_report: Callable[[VerifyReport], None] = None,
+    settle: float = VERIFY_SETTLE,
+    region=None,
+    watch_screen: bool = True,
 ) -> bool:
     """
     Perform an action and verify its success.
     If the verification fails, retry the action.
-    """
 
-    is_success = False
-    max_retries = retries
-    while not is_success and max_retries > 0:
-        do_action()
-        time.sleep(0.3)  # Wait a bit before verification
-        is_success = verify_success()
-        if is_success:
+    After each action and a short settle, the verification is polled on the
+    backoff schedule (and whenever the screen changes) for up to verify_timeout
+    seconds, so a slow but successful UI is not charged a repeat of the action.
+
+    Args:
+        retries: Maximum number of times the action is performed.
+        verify_timeout: Seconds to keep polling after each action.
+        backoff: Seconds between polls; the last interval repeats.
+        deadline: Optional overall limit in seconds across all attempts.
+        on_report: Optional callback receiving a VerifyReport at the end.
+        settle: Seconds to wait after each action before the first check.
+        region: (left, top, right, bottom) watched for changes, or None for the
+            primary monitor.
+        watch_screen: False for checks that do not read the screen (e.g. the
+            clipboard): skips change detection and checks on every poll.
+
+    Returns:
+        bool: Whether verification succeeded.
+    """
+    start = time.monotonic()
+    end = start + deadline if deadline is not None else None
+    intervals = tuple(backoff)
+    attempts = 0
+    poll = None
+    while attempts < retries:
+        attempts += 1
+        with span(logger, "do_and_verify", attempt=attempts) as sp:
+            do_action()
+            wait = settle
+            if end is not None:
+                wait = max(0.0, min(wait, end - time.monotonic()))
+            if wait > 0:
+                time.sleep(wait)
+            timeout = verify_timeout
+            if end is not None:
+                timeout = max(0.0, min(timeout, end - time.monotonic()))
+            poll = _poll_until(verify_success, timeout, intervals, region, watch_screen)
+            sp.set(success=poll is not None, poll=poll)
+        if poll is not None:
             break
 
         # If verification fails, clean up and retry
         clean_up()
 
-        max_retries -= 1
+        if end is not None and time.monotonic() >= end:
+            break
 
-    return is_success
+    report = VerifyReport(poll is not None, attempts, time.monotonic() - start, poll)
+    name = getattr(verify_success, "__qualname__", "verify_success")
+    if report.success:
+        logger.debug(
+            "%s succeeded on attempt %d, poll %d (%.2f s)",
+            name,
+            attempts,
+            poll,
+            report.elapsed,
+        )
+    else:
+        logger.info(
+            "%s failed after %d attempts (%.2f s)", name, attempts, report.elapsed
+        )
+    if on_report is not None:
+        on_report(report)
+    return report.success
 
 
 def send_to_clipboard(text: str):
     """
     Send text to the clipboard.
     """
-    subprocess.run("pbcopy", text=True, input=text)
+    get_clipboard().set_text(text)
 
 
 def receive_from_clipboard() -> str:
     """
     Receive text from the clipboard.
     """
-    result = subprocess.run("pbpaste", text=True, capture_output=True)
-    return result.stdout
+    return get_clipboard().get_text()
 
 
 def clear_clipboard():
@@ -69,6 +275,29 @@ def clear_clipboard():
     send_to_clipboard("")
 
 
+def clipboard_change_count() -> int:
+    """
+    Returns a counter that increases whenever the clipboard is replaced.
+    Read it before triggering a copy and pass it to wait_for_clipboard_change.
+    """
+    return get_clipboard().change_count()
+
+
+def expect_clipboard_change() -> int:
+    """
+    Like clipboard_change_count, but also notices a copy of the text already on
+    the clipboard (backends that only compare contents clear it first).
+    """
+    return get_clipboard().expect_change()
+
+
+def wait_for_clipboard_change(since: int, timeout: float = 5.0) -> bool:
+    """
+    Block until the clipboard changes after clipboard_change_count() returned since.
+    """
+    return get_clipboard().wait_for_change(since, timeout)
+
+
 def uk_to_us_date(uk_date: str) -> str:
     """
     Convert a UK date (DD/MM/YYYY) to a US date (MM/DD/YYYY).
@@ -77,34 +306,546 @@ def uk_to_us_date(uk_date: str) -> str:
     return f"{month}/{day}/{year}"
 
 
+# --- Template Matching ---
+
+# Coarse pass runs on frames and templates shrunk by this factor
+TEMPLATE_DOWNSCALE = 2
+# Coarse scores sit below full-resolution ones; candidates within this of the
+# requested confidence are refined at full resolution
+COARSE_SLACK = 0.15
+# Coarse candidates refined per search
+COARSE_CANDIDATES = 3
+
+# x, y: match centre; box: (left, top, width, height); all in screen pixels
+Match = namedtuple("Match", "x y score box")
+
+
+def _next_fast_len(n):
+    """Smallest 2^a * 3^b * 5^c >= n, a size numpy's FFT handles quickly."""
+    best = 2 * n
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            size = p35
+            while size < n:
+                size *= 2
+            best = min(best, size)
+            p35 *= 3
+        p5 *= 5
+    return best
+
+
+def _integrals(image):
+    """Zero-padded integral images of image and of its squares."""
+    sums = np.zeros((image.shape[0] + 1, image.shape[1] + 1))
+    np.cumsum(np.cumsum(image, axis=0), axis=1, out=sums[1:, 1:])
+    squares = np.zeros_like(sums)
+    np.cumsum(np.cumsum(image * image, axis=0), axis=1, out=squares[1:, 1:])
+    return sums, squares
+
+
+def _window_sums(integral, h, w):
+    """Sum of every h x w window (valid positions) from an integral image."""
+    return integral[h:, w:] - integral[:-h, w:] - integral[h:, :-w] + integral[:-h, :-w]
+
+
+def _normalise(numerator, integrals, h, w, t_norm):
+    """Turns raw correlations with a zero-mean template into NCC scores."""
+    sums = _window_sums(integrals[0], h, w)
+    variance = _window_sums(integrals[1], h, w) - sums * sums / (h * w)
+    denominator = np.sqrt(np.maximum(variance, 0)) * t_norm
+    scores = np.zeros_like(numerator)
+    np.divide(numerator, denominator, out=scores, where=variance > 1e-6)
+    return scores
+
+
+def match_template(image, template):
+    """
+    Normalised cross-correlation of template over image (like OpenCV's
+    TM_CCOEFF_NORMED), for every position where the template fits.
+
+    Uses cv2.matchTemplate when opencv-python is installed. The NumPy FFT
+    fallback gives the same scores but is several times slower: a full-screen
+    coarse-to-fine TemplateLibrary.locate on a 3456x2234 Retina frame takes
+    roughly 125-140 ms per template with it, against tens of ms with OpenCV.
+
+    Args:
+        image (np.ndarray): Grayscale float image.
+        template (np.ndarray): Grayscale float template, no larger than image.
+
+    Returns:
+        np.ndarray: Scores in [-1, 1], shape (H - h + 1, W - w + 1).
+    """
+    if cv2 is not None:
+        return cv2.matchTemplate(
+            image.astype(np.float32), template.astype(np.float32), cv2.TM_CCOEFF_NORMED
+        )
+
+    h, w = template.shape
+    t = template - template.mean()
+    t_norm = math.sqrt(float((t * t).sum()))
+    # Padding to the image size is enough: valid positions never wrap around
+    shape = (_next_fast_len(image.shape[0]), _next_fast_len(image.shape[1]))
+    corr = np.fft.irfft2(
+        np.fft.rfft2(image, shape) * np.conj(np.fft.rfft2(t, shape)), shape
+    )
+    numerator = corr[: image.shape[0] - h + 1, : image.shape[1] - w + 1]
+    return _normalise(numerator, _integrals(image), h, w, t_norm)
+
+
+class Template:
+    """A template decoded once into full-resolution and coarse grayscale arrays."""
+
+    __slots__ = ("path", "full", "coarse", "_coarse_ffts")
+
+    def __init__(self, path, downscale=TEMPLATE_DOWNSCALE):
+        self.path = str(path)
+        with Image.open(path) as img:
+            gray = img.convert("L")
+        self.full = np.asarray(gray, dtype=np.float64)
+        size = (gray.width // downscale, gray.height // downscale)
+        # Templates too small to shrink are matched at full size instead
+        self.coarse = (
+            np.asarray(gray.resize(size, Image.BOX), dtype=np.float64)
+            if min(size) >= 4
+            else None
+        )
+        self._coarse_ffts = {}
+
+    def coarse_fft(self, shape):
+        """Conjugate FFT of the zero-mean coarse template, plus its norm."""
+        cached = self._coarse_ffts.get(shape)
+        if cached is None:
+            t = self.coarse - self.coarse.mean()
+            cached = (
+                np.conj(np.fft.rfft2(t, shape)),
+                math.sqrt(float((t * t).sum())),
+            )
+            self._coarse_ffts[shape] = cached
+        return cached
+
+
+class PreparedFrame:
+    """
+    A captured frame converted once for matching any number of templates.
+
+    The coarse frame's FFT and integral images are computed on first use, so
+    each template only costs one product, one inverse FFT and a normalisation.
+    """
+
+    def __init__(self, img, downscale=TEMPLATE_DOWNSCALE):
+        self._gray = img.convert("L")
+        self.downscale = downscale
+        self.full = np.asarray(self._gray)
+        self._coarse = None
+        self._lock = threading.Lock()
+        self._cached = None
+
+    @property
+    def coarse(self):
+        """The downscaled frame, built on first use (windowed searches skip it)."""
+        if self._coarse is None:
+            size = (
+                self._gray.width // self.downscale,
+                self._gray.height // self.downscale,
+            )
+            self._coarse = np.asarray(
+                self._gray.resize(size, Image.BOX), dtype=np.float64
+            )
+        return self._coarse
+
+    def _coarse_transforms(self):
+        with self._lock:
+            if self._cached is None:
+                shape = tuple(_next_fast_len(n) for n in self.coarse.shape)
+                self._cached = (
+                    shape,
+                    np.fft.rfft2(self.coarse, shape),
+                    _integrals(self.coarse),
+                )
+            return self._cached
+
+    def coarse_scores(self, template):
+        """NCC scores of template.coarse over the coarse frame."""
+        if cv2 is not None:
+            return match_template(self.coarse, template.coarse)
+        shape, frame_fft, integrals = self._coarse_transforms()
+        template_fft, t_norm = template.coarse_fft(shape)
+        h, w = template.coarse.shape
+        corr = np.fft.irfft2(frame_fft * template_fft, shape)
+        numerator = corr[: self.coarse.shape[0] - h + 1, : self.coarse.shape[1] - w + 1]
+        return _normalise(numerator, integrals, h, w, t_norm)
+
+
+class LocationMemory:
+    """
+    Remembers where each template was last found, persisted as JSON.
+
+    Buttons in Epic sit in nearly the same place every time, so a padded window
+    around the last location is searched first and the full screen only on a miss.
+
+    Args:
+        path (str, optional): JSON file to load from and save to.
+        padding (int): Pixels searched around the remembered box on each side.
+    """
+
+    def __init__(self, path=None, padding=48):
+        self.path = path
+        self.padding = padding
+        self.locations = {}  # template path -> (left, top, width, height)
+        self.counts = {}  # template path -> [window hits, window misses, cold]
+        self._dirty = False
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "r") as f:
+                self.locations = {k: tuple(v) for k, v in json.load(f).items()}
+        if path:
+            atexit.register(self.save)
+
+    def expected(self, key):
+        """Last known box for key, or None."""
+        return self.locations.get(key)
+
+    def record(self, key, box, outcome):
+        """
+        Records a lookup.
+
+        Args:
+            key (str): Template path.
+            box (tuple or None): Where it was found, if anywhere.
+            outcome (str): "hit" (found in the window), "miss" (window searched,
+                           fell back to full screen) or "cold" (no location yet).
+        """
+        with self._lock:
+            counts = self.counts.setdefault(key, [0, 0, 0])
+            counts[("hit", "miss", "cold").index(outcome)] += 1
+            if box is not None and self.locations.get(key) != tuple(box):
+                self.locations[key] = tuple(box)
+                self._dirty = True
+
+    def stats(self):
+        """Returns overall and per-template hit counts and the window hit rate."""
+        with self._lock:
+            hits, misses, cold = (
+                sum(c[i] for c in self.counts.values()) for i in range(3)
+            )
+            lookups = hits + misses + cold
+            return {
+                "hits": hits,
+                "misses": misses,
+                "cold": cold,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "per_template": {k: tuple(c) for k, c in self.counts.items()},
+            }
+
+    def save(self, path=None):
+        """Writes the remembered locations if they changed."""
+        path = path or self.path
+        with self._lock:
+            if not path or not self._dirty:
+                return
+            data = {k: list(v) for k, v in self.locations.items()}
+            self._dirty = False
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+
+
+class TemplateLibrary:
+    """
+    Decoded templates plus a coarse-to-fine matcher.
+
+    Candidates are found on a downscaled frame and then refined in a small
+    full-resolution window, so a search costs a fraction of a full-resolution scan.
+    Full-screen searches reach tens of milliseconds only with opencv-python
+    installed (see match_template); with a LocationMemory, a template found
+    where it was last seen needs only a small window either way.
+    """
+
+    def __init__(self, downscale=TEMPLATE_DOWNSCALE, memory=None):
+        self.downscale = downscale
+        self.memory = memory
+        self._templates = {}
+        self._lock = threading.Lock()
+        self._frame_source = None
+        self._frame = None
+
+    def preload(self, directory, pattern="*.png"):
+        """Decodes every template in directory. Returns the number loaded."""
+        paths = sorted(Path(directory).glob(pattern))
+        for path in paths:
+            self.get(path)
+        logger.debug("Preloaded %d templates from %s", len(paths), directory)
+        return len(paths)
+
+    def get(self, path):
+        """Returns the decoded template for path, loading it on first use."""
+        key = str(path)
+        template = self._templates.get(key)
+        if template is None:
+            template = Template(path, self.downscale)
+            with self._lock:
+                self._templates.setdefault(key, template)
+        return template
+
+    def prepare(self, img):
+        """Returns the PreparedFrame for img, reusing it while img is unchanged."""
+        with self._lock:
+            if self._frame_source is not img:
+                self._frame = PreparedFrame(img, self.downscale)
+                self._frame_source = img
+            return self._frame
+
+    def _refine(self, template, frame, left, top, margin):
+        """Best full-resolution match in a window around (left, top)."""
+        h, w = template.full.shape
+        top0, left0 = max(0, top - margin), max(0, left - margin)
+        crop = frame.full[top0 : top + h + margin, left0 : left + w + margin]
+        if crop.shape[0] < h or crop.shape[1] < w:
+            return None
+        scores = match_template(crop.astype(np.float64), template.full)
+        y, x = np.unravel_index(np.argmax(scores), scores.shape)
+        return float(scores[y, x]), left0 + int(x), top0 + int(y)
+
+    def locate(self, image_path, img, confidence=0.8):
+        """
+        Finds the best match of a template in a frame.
+
+        Args:
+            image_path (str or Path): Template PNG.
+            img (PIL.Image.Image): Frame to search, in screen pixels.
+            confidence (float): Minimum normalised correlation to accept.
+
+        Returns:
+            Match or None: Best match at or above confidence.
+        """
+        template = self.get(image_path)
+        frame = self.prepare(img)
+        h, w = template.full.shape
+        if h > frame.full.shape[0] or w > frame.full.shape[1]:
+            return None
+        if self.memory is None:
+            return self._search(template, frame, confidence)
+
+        key = str(image_path)
+        box = self.memory.expected(key)
+        if box is not None:
+            found = self._refine(template, frame, box[0], box[1], self.memory.padding)
+            if found and found[0] >= confidence:
+                score, left, top = found
+                self.memory.record(key, (left, top, w, h), "hit")
+                return Match(left + w // 2, top + h // 2, score, (left, top, w, h))
+
+        match = self._search(template, frame, confidence)
+        self.memory.record(
+            key, match.box if match else None, "cold" if box is None else "miss"
+        )
+        return match
+
+    def _search(self, template, frame, confidence):
+        """Full-frame coarse-to-fine search."""
+        h, w = template.full.shape
+        if template.coarse is None:
+            found = self._refine(template, frame, 0, 0, max(frame.full.shape))
+            candidates = [found] if found else []
+        else:
+            scores = frame.coarse_scores(template)
+            ch, cw = template.coarse.shape
+            candidates = []
+            for _ in range(COARSE_CANDIDATES):
+                y, x = np.unravel_index(np.argmax(scores), scores.shape)
+                if scores[y, x] < confidence - COARSE_SLACK:
+                    break
+                # Suppress this peak before looking for the next one
+                scores[
+                    max(0, y - ch // 2) : y + ch // 2 + 1,
+                    max(0, x - cw // 2) : x + cw // 2 + 1,
+                ] = -1
+                found = self._refine(
+                    template,
+                    frame,
+                    int(x) * self.downscale,
+                    int(y) * self.downscale,
+                    2 * self.downscale,
+                )
+                if found:
+                    candidates.append(found)
+
+        if not candidates:
+            return None
+        score, left, top = max(candidates)
+        if score < confidence:
+            return None
+        return Match(left + w // 2, top + h // 2, score, (left, top, w, h))
+
+    def locate_all(self, image_path, img, confidence=0.8, distance_threshold=20):
+        """
+        Finds every match of a template in a frame.
+
+        All coarse positions near the confidence are clustered (best score kept
+        per cluster) before refinement, so dense match maps stay cheap.
+
+        Returns:
+            list: Match per instance, in reading order (top to bottom, left to right).
+        """
+        template = self.get(image_path)
+        frame = self.prepare(img)
+        h, w = template.full.shape
+        if h > frame.full.shape[0] or w > frame.full.shape[1]:
+            return []
+
+        if template.coarse is None:
+            scores = match_template(frame.full.astype(np.float64), template.full)
+            ys, xs = np.nonzero(scores >= confidence)
+            found = list(zip(scores[ys, xs].tolist(), xs.tolist(), ys.tolist()))
+        else:
+            scores = frame.coarse_scores(template)
+            ys, xs = np.nonzero(scores >= confidence - COARSE_SLACK)
+            points = np.column_stack((xs, ys)) * self.downscale
+            found = []
+            for i in cluster_indices(points, distance_threshold, scores[ys, xs]):
+                refined = self._refine(
+                    template,
+                    frame,
+                    int(points[i, 0]),
+                    int(points[i, 1]),
+                    2 * self.downscale,
+                )
+                if refined and refined[0] >= confidence:
+                    found.append(refined)
+
+        kept = cluster_indices(
+            [(left, top) for _, left, top in found],
+            distance_threshold,
+            [score for score, _, _ in found],
+        )
+        matches = [
+            Match(left + w // 2, top + h // 2, score, (left, top, w, h))
+            for score, left, top in (found[i] for i in kept)
+        ]
+        return sorted(matches, key=lambda m: (m.box[1], m.box[0]))
+
+
+# Shared library; epic.init() preloads assets/*.png into it and attaches a
+# LocationMemory
+templates = TemplateLibrary()
+
+
+_match_executor = None
+_match_executor_lock = threading.Lock()
+
+
+def get_match_executor():
+    """Returns the thread pool used to match several templates against one frame."""
+    global _match_executor
+    if _match_executor is None:
+        with _match_executor_lock:
+            if _match_executor is None:
+                _match_executor = ThreadPoolExecutor(
+                    max_workers=min(4, os.cpu_count() or 1),
+                    thread_name_prefix="template",
+                )
+    return _match_executor
+
+
+def _locate_in_frame(image_path, frame, confidence, digest):
+    """Locates a template in frame, cached by digest unless digest is None."""
+
+    def _locate():
+        return templates.locate(image_path, frame, confidence=confidence)
+
+    if digest is None:
+        return _locate()
+    return perception_cache.get_or_compute(
+        ("template", str(image_path), confidence, digest), _locate
+    )
+
+
+def locate_center(image_path, confidence=0.8, use_cache=True):
+    """
+    Locates an image on the primary screen.
+
+    The screen is grabbed through the shared capture session and the result is
+    cached by frame content, so re-checking an unchanged screen skips the search.
+
+    Returns:
+        Match or None: Centre (x, y) and score of the match in screen pixels,
+                       or None if not found.
+    """
+    frame = get_capture_session().grab_monitor(1)[1]
+    digest = frame_digest(frame) if use_cache else None
+    return _locate_in_frame(image_path, frame, confidence, digest)
+
+
+def detect_any(image_paths, confidence=0.8, use_cache=True):
+    """
+    Matches several templates against a single capture of the primary screen.
+
+    The frame is grabbed and prepared once; templates are then matched
+    concurrently (the FFTs and OpenCV release the GIL), so a branching check
+    such as "chart, break-the-glass or deceased dialog?" costs one capture.
+
+    Args:
+        image_paths (list): Template PNGs to look for.
+        confidence (float): Minimum match score.
+        use_cache (bool): Reuse results for an unchanged frame.
+
+    Returns:
+        dict: {image_path (str): Match} for every template found, in the order given.
+    """
+    frame = get_capture_session().grab_monitor(1)[1]
+    digest = frame_digest(frame) if use_cache else None
+    templates.prepare(frame)
+    with span(logger, "detect_any", templates=len(image_paths)) as sp:
+        matches = list(
+            get_match_executor().map(
+                lambda path: _locate_in_frame(path, frame, confidence, digest),
+                image_paths,
+            )
+        )
+        hits = {str(path): m for path, m in zip(image_paths, matches) if m}
+        sp.set(hits=len(hits))
+    return hits
+
+
+def locate_all(image_path, confidence=0.8, distance_threshold=20):
+    """
+    Locates every instance of an image on the primary screen.
+
+    Returns:
+        list: Match per instance, in reading order, one per cluster of nearby hits.
+    """
+    frame = get_capture_session().grab_monitor(1)[1]
+    return templates.locate_all(image_path, frame, confidence, distance_threshold)
+
+
 def find_and_click(image_path, offset_x=0, offset_y=0, button="left", confidence=0.8):
     try:
-        button_location = pyautogui.locateCenterOnScreen(
-            image_path, confidence=confidence
-        )
+        button_location = locate_center(image_path, confidence=confidence)
         if button_location:
             pyautogui.click(
                 (button_location.x + offset_x) // DISPLAY_SCALE,
                 (button_location.y + offset_y) // DISPLAY_SCALE,
                 button=button,
             )
+            get_capture_session().invalidate()
             return True
         else:
-            print(f"Failed to find image: {image_path}")
+            logger.warning("Failed to find image: %s", image_path)
             return False
     except Exception as e:
-        print(f"Error clicking on image '{image_path}': {e}")
+        logger.error("Error clicking on image '%s': %s", image_path, e)
         return False
 
 
 def find_image_on_screen(image_path, confidence=0.8) -> bool:
     try:
-        button_location = pyautogui.locateCenterOnScreen(
-            image_path, confidence=confidence
-        )
+        button_location = locate_center(image_path, confidence=confidence)
         return button_location is not None
     except Exception as e:
-        print(f"Error finding image on screen '{image_path}': {e}")
+        logger.error("Error finding image on screen '%s': %s", image_path, e)
         return False
 
 
@@ -114,33 +855,82 @@ def click(x, y, scaled=False):
             pyautogui.click(x, y)
         else:
             pyautogui.click(x // DISPLAY_SCALE, y // DISPLAY_SCALE)
+        get_capture_session().invalidate()
         return True
     except Exception as e:
-        print(f"Error clicking at ({x}, {y}): {e}")
+        logger.error("Error clicking at (%s, %s): %s", x, y, e)
         return False
 
 
-def group_locations(locations, distance_threshold=20):
+def cluster_indices(points, distance_threshold=20, scores=None):
     """
-    Groups nearby coordinate locations into single points.
-    It takes a list of locations (like those from pyautogui) and
-    returns a filtered list where clustered detections are reduced to one.
-    """
-    grouped_locations = []
-    for loc in locations:
-        # Check if the location is too close to any already in our grouped list
-        is_close_to_existing = False
-        for grouped_loc in grouped_locations:
-            # Calculate the Euclidean distance between the centers
-            dist = math.sqrt(
-                (loc[0] - grouped_loc[0]) ** 2 + (loc[1] - grouped_loc[1]) ** 2
-            )
-            if dist < distance_threshold:
-                is_close_to_existing = True
-                break
+    Greedy non-maximum suppression of nearby points.
 
-        # If it's not close to any existing point, it's a new unique location
-        if not is_close_to_existing:
-            grouped_locations.append(loc)
+    Points are visited best score first (input order without scores) and kept
+    unless a kept point lies within distance_threshold. Points are bucketed in a
+    grid of threshold-sized cells, so keeping a point only has to suppress the
+    points in the nine neighbouring cells, and every other point costs one lookup.
 
-    return grouped_locations
+    Args:
+        points: (N, 2) array-like of x, y.
+        distance_threshold (float): Points closer than this form one cluster.
+        scores: Optional (N,) array-like; higher is better.
+
+    Returns:
+        list: Indices of the kept points, in input order.
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if scores is None:
+        order = range(len(pts))
+    else:
+        order = np.argsort(-np.asarray(scores, dtype=np.float64), kind="stable")
+        order = order.tolist()
+
+    cell_xy = np.floor(pts / distance_threshold).astype(np.int64)
+    # Bucket point indices by cell with one sort instead of a Python loop
+    by_cell = np.lexsort((cell_xy[:, 1], cell_xy[:, 0]))
+    sorted_cells = cell_xy[by_cell]
+    starts = np.flatnonzero(np.any(np.diff(sorted_cells, axis=0) != 0, axis=1)) + 1
+    grid = {
+        tuple(cell): bucket
+        for cell, bucket in zip(
+            sorted_cells[np.r_[0, starts]].tolist() if len(pts) else [],
+            np.split(by_cell, starts),
+        )
+    }
+
+    limit = distance_threshold * distance_threshold
+    suppressed = np.zeros(len(pts), dtype=bool)
+    kept = []
+    for i in order:
+        if suppressed[i]:
+            continue
+        kept.append(i)
+        x, y = pts[i].tolist()
+        cx, cy = cell_xy[i].tolist()
+        for gx in (cx - 1, cx, cx + 1):
+            for gy in (cy - 1, cy, cy + 1):
+                bucket = grid.get((gx, gy))
+                if bucket is None:
+                    continue
+                if len(bucket) > 32:
+                    # Dense cell (e.g. a raw match map): suppress vectorised
+                    near = ((pts[bucket] - (x, y)) ** 2).sum(axis=1) < limit
+                    suppressed[bucket[near]] = True
+                else:
+                    for j, (px, py) in zip(bucket.tolist(), pts[bucket].tolist()):
+                        if (px - x) ** 2 + (py - y) ** 2 < limit:
+                            suppressed[j] = True
+    kept.sort()
+    return kept
+
+
+def group_locations(locations, distance_threshold=20, scores=None):
+    """
+    Groups nearby coordinate locations into single points.
+    It takes a list of locations (like those from pyautogui) and
+    returns a filtered list where clustered detections are reduced to one:
+    the highest-scoring one if scores are given, otherwise the first.
+    """
+    points = [(loc[0], loc[1]) for loc in locations]
+    return [locations[i] for i in cluster_indices(points, distance_threshold, scores)]
@@ -0,0 +1,172 @@
+"""
+Leveled logging and timing spans for screenscript.
+
+Modules log through standard `logging` loggers named after the module
+("screenocr", "macro", "src.epic", ...), so levels can be set per module.
+Until configure_tracing() (or logging.basicConfig) is called only warnings and
+errors reach stderr, and disabled debug calls and spans cost a level check.
+
+Example:
+    configure_tracing(
+        level="INFO",
+        levels={"screenocr": "DEBUG", "macro": "WARNING"},
+        jsonl_path="trace.jsonl",
+    )
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import time
+
+
+class _NullSpan:
+    """Shared no-op span returned when the span's level is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **fields):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """
+    Times a block and logs its duration (plus any fields) when it exits.
+
+    Use through span(), which skips the timing entirely when disabled.
+    """
+
+    __slots__ = ("logger", "name", "level", "fields", "_start")
+
+    def __init__(self, logger, name, level, fields):
+        self.logger = logger
+        self.name = name
+        self.level = level
+        self.fields = fields
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed_ms = (time.perf_counter() - self._start) * 1000
+        fields = dict(self.fields, span=self.name, elapsed_ms=round(elapsed_ms, 3))
+        if exc_type is not None:
+            fields["error"] = repr(exc)
+        self.logger.log(
+            self.level,
+            "%s took %.1f ms",
+            self.name,
+            elapsed_ms,
+            extra={"trace": fields},
+        )
+        return False
+
+    def set(self, **fields):
+        """Adds fields to be logged when the span ends (e.g. a result)."""
+        self.fields.update(fields)
+
+
+def span(logger, name, level=logging.DEBUG, **fields):
+    """
+    Returns a context manager timing a block, or a shared no-op if disabled.
+
+    Args:
+        logger (logging.Logger): Logger the span is reported on.
+        name (str): Span name, e.g. "ocr".
+        level (int): Level the span is logged at.
+        **fields: Extra structured fields for the JSONL output.
+    """
+    if not logger.isEnabledFor(level):
+        return _NULL_SPAN
+    return Span(logger, name, level, fields)
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, including span fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "trace", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+_listener = None
+_queue_handler = None
+
+
+def configure_tracing(level="WARNING", levels=None, console=True, jsonl_path=None):
+    """
+    Configures log levels and output for all screenscript modules.
+
+    Records are handed to a background thread through a queue, so enabled
+    logging does not block the caller on terminal or file writes.
+
+    Args:
+        level (str or int): Default level for every logger.
+        levels (dict, optional): Per-module overrides, e.g. {"screenocr": "DEBUG"}.
+        console (bool): Write human-readable lines to stderr.
+        jsonl_path (str, optional): Also append JSON lines to this file.
+    """
+    global _listener, _queue_handler
+    shutdown_tracing()
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    for name, module_level in (levels or {}).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    handlers = []
+    if console:
+        stream = logging.StreamHandler()
+        stream.setFormatter(
+            logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        )
+        handlers.append(stream)
+    if jsonl_path:
+        jsonl = logging.FileHandler(jsonl_path, mode="a", encoding="utf-8")
+        jsonl.setFormatter(JsonLinesFormatter())
+        handlers.append(jsonl)
+    if not handlers:
+        return
+
+    _queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    root.addHandler(_queue_handler)
+    _listener = logging.handlers.QueueListener(
+        _queue_handler.queue, *handlers, respect_handler_level=True
+    )
+    _listener.start()
+
+
+def shutdown_tracing():
+    """Flushes pending records and removes the handlers added by configure_tracing."""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_tracing)
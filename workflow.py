@@ -22,6 +22,7 @@ def has_psma_pet(iterations=500):
     pmr_lib = PyMacroRecordLib()
     pmr_lib.set_stop_key("esc")
     pmr_lib.reset_main_loop_stop_request()
+    epic.init()
 
     logger.info("--- Starting Main Processing Loop ---")
     logger.info(f"Press '{pmr_lib.stop_key}' at any time to stop the script.")
@@ -42,7 +43,9 @@ def has_psma_pet(iterations=500):
 
                 no_psma_pet = utils.retry_till_false(
                     lambda: find_text_on_screen(
-                        "No results found for", region=(175, 375, 930, 960)
+                        "No results found for",
+                        region=(175, 375, 930, 960),
+                        fuzzy=True,
                     ),
                     retries=2,
                     delay=0.75,